@@ -0,0 +1,2 @@
+"""Замеры производительности преобразований грамматик на синтетических
+грамматиках (см. benchmarks.generator и benchmarks.run)"""
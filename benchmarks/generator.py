@@ -0,0 +1,52 @@
+import random
+
+from config import BaseConfig
+from grammar import Grammar
+
+
+def generate_grammar(seed=0, non_terms=10, alternatives=3, rhs_length=4, left_recursion=0.2,
+                     nullable=0.0, terms=None, non_term_ratio=0.3):
+    """Генерация синтетической грамматики.
+
+    non_terms - число нетерминалов N0..N{non_terms-1} (N0 - стартовый),
+    alternatives - число продукций на каждый нетерминал,
+    rhs_length - наибольшая длина правой части,
+    left_recursion - доля продукций вида Ni->Njγ, j <= i (прямая или косвенная
+    левая рекурсия),
+    nullable - доля нетерминалов с продукцией Ni->ε,
+    terms - число терминалов (по умолчанию равно non_terms),
+    non_term_ratio - доля нетерминалов среди остальных символов правой части.
+
+    Первая продукция каждого нетерминала состоит только из терминалов, поэтому
+    все нетерминалы порождающие. Цепные продукции вида A->B не генерируются,
+    поэтому грамматика не содержит циклов"""
+    rng = random.Random(seed)
+    non_term_names = ['N' + str(i) for i in range(non_terms)]
+    term_names = ['t' + str(i) for i in range(terms or non_terms)]
+
+    productions = []
+    for i, symbol in enumerate(non_term_names):
+        for k in range(alternatives):
+            length = rng.randint(1, rhs_length)
+            if k > 0 and rng.random() < left_recursion:
+                right_part = [non_term_names[rng.randint(0, i)]]
+                length = max(length, 2)
+            else:
+                right_part = [rng.choice(term_names)]
+
+            for _ in range(length - 1):
+                if k > 0 and rng.random() < non_term_ratio:
+                    right_part.append(rng.choice(non_term_names))
+                else:
+                    right_part.append(rng.choice(term_names))
+            productions.append([symbol, right_part])
+
+        if rng.random() < nullable:
+            productions.append([symbol, [BaseConfig.EPSILON_SYMBOL]])
+
+    grammar = Grammar()
+    grammar.terms = term_names
+    grammar.non_terms = non_term_names
+    grammar.start_symbol = non_term_names[0]
+    grammar.productions = productions
+    return grammar
@@ -0,0 +1,121 @@
+"""Замер скорости LL(1)-анализатора в терминалах в секунду:
+python -m benchmarks.parser [--sentences 10000] [--length 100] [--seed 0]"""
+import argparse
+import gc
+import random
+import sys
+import time
+
+from grammar import Grammar
+from ll1 import LL1Parser, LL1Table
+
+
+def expression_grammar():
+    """Грамматика арифметических выражений без левой рекурсии (LL(1))"""
+    grammar = Grammar()
+    grammar.terms = ['+', '*', '(', ')', 'id']
+    grammar.non_terms = ['E', "E'", 'T', "T'", 'F']
+    grammar.start_symbol = 'E'
+    grammar.productions = [['E', ['T', "E'"]], ["E'", ['+', 'T', "E'"]], ["E'", ['ε']],
+                           ['T', ['F', "T'"]], ["T'", ['*', 'F', "T'"]], ["T'", ['ε']],
+                           ['F', ['(', 'E', ')']], ['F', ['id']]]
+    return grammar
+
+
+def _shortest_productions(grammar):
+    """Для каждого нетерминала - продукция с самым коротким выводом цепочки терминалов"""
+    non_terms = set(grammar.non_terms)
+    lengths = {}
+    shortest = {}
+    changed = True
+    while changed:
+        changed = False
+        for left, right in grammar.productions:
+            if any(x in non_terms and x not in lengths for x in right):
+                continue
+            length = sum(lengths[x] if x in non_terms else x != 'ε' for x in right)
+            if length < lengths.get(left, length + 1):
+                lengths[left] = length
+                shortest[left] = right
+                changed = True
+    return shortest
+
+
+def generate_sentences(grammar, count, length, seed=0):
+    """Генерация count цепочек языка грамматики. Нетерминалы раскрываются
+    случайными продукциями, пока длина цепочки меньше length, затем -
+    продукциями с самым коротким выводом"""
+    rng = random.Random(seed)
+    non_terms = set(grammar.non_terms)
+    alternatives = {}
+    for left, right in grammar.productions:
+        alternatives.setdefault(left, []).append(right)
+    shortest = _shortest_productions(grammar)
+
+    sentences = []
+    for _ in range(count):
+        sentence = []
+        stack = [grammar.start_symbol]
+        while stack:
+            symbol = stack.pop()
+            if symbol in non_terms:
+                right = rng.choice(alternatives[symbol]) if len(sentence) + len(stack) < length else shortest[symbol]
+                stack.extend(reversed(right))
+            elif symbol != 'ε':
+                sentence.append(symbol)
+        sentences.append(sentence)
+    return sentences
+
+
+def measure(sentences, repeat=3):
+    """Скорость разбора (терминалов в секунду, лучший из repeat запусков)
+    для разбора набора цепочек, заранее закодированных цепочек и цепочек,
+    читаемых из итератора"""
+    parser = LL1Parser(LL1Table(expression_grammar()))
+    tokens = sum(len(x) for x in sentences)
+    encoded = [parser.encode(x) for x in sentences]
+
+    modes = {
+        'parse_batch': lambda: parser.parse_batch(sentences),
+        'parse_encoded': lambda: [parser.parse_encoded(x) for x in encoded],
+        'parse_iterator': lambda: [parser.parse(iter(x)) for x in sentences],
+    }
+
+    results = []
+    for mode, function in modes.items():
+        seconds = None
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                accepted = function()
+                elapsed = time.perf_counter() - start
+            finally:
+                gc.enable()
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+        if not all(accepted):
+            raise BaseException('Parser rejected a generated sentence')
+        results.append({'mode': mode, 'sentences': len(sentences), 'tokens': tokens, 'seconds': seconds,
+                        'tokens_per_second': tokens / max(seconds, 1e-9)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='LL(1) parser throughput benchmark')
+    parser.add_argument('--sentences', type=int, default=10000)
+    parser.add_argument('--length', type=int, default=100, help='approximate sentence length in tokens')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    sentences = generate_sentences(expression_grammar(), args.sentences, args.length, args.seed)
+    for result in measure(sentences, args.repeat):
+        print('{mode:15} {sentences:8} sentences {tokens:10} tokens {seconds:8.3f} s '
+              '{tokens_per_second:12.0f} tokens/s'.format(**result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Запуск замеров: python -m benchmarks.run [--quick] [--output results.json]
+[--baseline benchmarks/baseline.json] [--update-baseline]"""
+import argparse
+import gc
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.generator import generate_grammar
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def _remove_left_recursion_direct(grammar):
+    for symbol in list(grammar.non_terms):
+        grammar.remove_left_recursion_direct_symbol(symbol)
+
+
+# Операция -> (функция, параметры генератора, размеры (число нетерминалов))
+OPERATIONS = {
+    'remove_left_recursion_direct_symbol': (
+        _remove_left_recursion_direct,
+        dict(alternatives=8, rhs_length=5, left_recursion=0.5),
+        [250, 500, 1000, 2000]),
+    'remove_left_recursion_indirect': (
+        lambda grammar: grammar.remove_left_recursion_indirect(),
+        dict(alternatives=3, rhs_length=3, left_recursion=0.3),
+        [25, 50, 100, 200]),
+    'remove_left_recursion_moore': (
+        lambda grammar: grammar.remove_left_recursion_moore(),
+        dict(alternatives=3, rhs_length=3, left_recursion=0.3),
+        [100, 200, 400, 800]),
+    'left_factoring': (
+        lambda grammar: grammar.left_factoring(),
+        dict(alternatives=20, rhs_length=5, left_recursion=0.0, terms=4),
+        [50, 100, 200, 400]),
+    'remove_eps_productions': (
+        lambda grammar: grammar.remove_eps_productions(),
+        dict(alternatives=6, rhs_length=5, left_recursion=0.1, nullable=0.3, non_term_ratio=0.5),
+        [125, 250, 500, 1000]),
+}
+
+
+def measure(operation, size, seed=0, repeat=5):
+    """Время (лучшее из repeat запусков) и пиковый объем памяти одного замера"""
+    function, params, _ = OPERATIONS[operation]
+
+    seconds = None
+    for _ in range(repeat):
+        grammar = generate_grammar(seed=seed, non_terms=size, **params)
+        # Как и в timeit, сборщик мусора отключается на время замера
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function(grammar)
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    # Отдельный запуск под tracemalloc, чтобы трассировка не искажала время
+    grammar = generate_grammar(seed=seed, non_terms=size, **params)
+    tracemalloc.start()
+    try:
+        function(grammar)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'operation': operation, 'size': size, 'seconds': seconds, 'peak_bytes': peak_bytes,
+            'productions': len(grammar.productions)}
+
+
+def run(operations=None, quick=False, seed=0, repeat=5):
+    results = []
+    for operation in operations or OPERATIONS:
+        sizes = OPERATIONS[operation][2]
+        if quick:
+            sizes = sizes[:2]
+        for size in sizes:
+            results.append(measure(operation, size, seed=seed, repeat=repeat))
+    return results
+
+
+def _exponents(results):
+    """Показатель роста времени для каждой операции: наклон прямой, построенной
+    методом наименьших квадратов по точкам (log размера, log времени)"""
+    points = {}
+    for result in results:
+        points.setdefault(result['operation'], []).append(
+            (math.log(result['size']), math.log(max(result['seconds'], 1e-9))))
+
+    exponents = {}
+    for operation, xy in points.items():
+        if len(xy) < 2:
+            continue
+        mean_x = sum(x for x, _ in xy) / len(xy)
+        mean_y = sum(y for _, y in xy) / len(xy)
+        exponents[operation] = sum((x - mean_x) * (y - mean_y) for x, y in xy) / \
+            sum((x - mean_x) ** 2 for x, _ in xy)
+    return exponents
+
+
+def compare(results, baseline, exponent_tolerance=0.5, memory_tolerance=2.0):
+    """Сравнение с эталонными результатами. Для времени сравнивается показатель
+    роста (не зависит от скорости конкретной машины), для памяти - пиковый
+    объем при каждом размере. Возвращает список регрессий"""
+    regressions = []
+
+    expected_exponents = _exponents(baseline)
+    for operation, exponent in sorted(_exponents(results).items()):
+        expected = expected_exponents.get(operation)
+        if expected is not None and exponent > expected + exponent_tolerance:
+            regressions.append({'operation': operation, 'size': None, 'metric': 'time exponent',
+                                'value': exponent, 'baseline': expected})
+
+    expected_peaks = {(x['operation'], x['size']): x['peak_bytes'] for x in baseline}
+    for result in results:
+        expected = expected_peaks.get((result['operation'], result['size']))
+        if expected is not None and result['peak_bytes'] > expected * memory_tolerance:
+            regressions.append({'operation': result['operation'], 'size': result['size'],
+                                'metric': 'peak memory', 'value': result['peak_bytes'], 'baseline': expected})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grammar transformation benchmarks')
+    parser.add_argument('--operation', action='append', choices=list(OPERATIONS),
+                        help='operation to measure (default: all)')
+    parser.add_argument('--quick', action='store_true', help='measure only the two smallest sizes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--exponent-tolerance', type=float, default=0.5,
+                        help='allowed increase of the time growth exponent')
+    parser.add_argument('--memory-tolerance', type=float, default=2.0,
+                        help='allowed ratio of peak memory to the baseline')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run(args.operation, quick=args.quick, seed=args.seed, repeat=args.repeat)
+    report = {'python': sys.version.split()[0], 'seed': args.seed, 'results': results}
+
+    for result in results:
+        print('{operation:40} {size:6} {seconds:10.4f} s {peak_bytes:12} B {productions:8}'.format(**result))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+
+    regressions = compare(results, baseline, args.exponent_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print('REGRESSION {operation} size={size} {metric}: {value:.3f} (baseline {baseline:.3f})'.format(**regression))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import mmap
+import struct
+import sys
+from array import array
+
+# Формат файла (все числа - беззнаковые 32-битные little-endian):
+#   заголовок _HEADER
+#   смещения имен символов (n_symbols + 1), имена в UTF-8 (выровнены до 4 байт)
+#   номера терминалов (n_terms), номера нетерминалов (n_non_terms)
+#   левые части продукций (n_productions)
+#   смещения правых частей (n_productions + 1), символы правых частей (n_right_symbols)
+MAGIC = b'GRMB'
+VERSION = 1
+NO_SYMBOL = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<4sHHIIIIII')
+
+
+def _to_bytes(numbers):
+    numbers = array('I', numbers)
+    if sys.byteorder != 'little':
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _from_buffer(buffer, offset, count):
+    """Чтение count чисел начиная с offset. На little-endian платформах
+    возвращается представление буфера без копирования"""
+    end = offset + count * 4
+    if end > len(buffer):
+        raise ValueError('Unexpected end of binary file')
+
+    if sys.byteorder == 'little':
+        return buffer[offset:end].cast('I'), end
+
+    numbers = array('I', buffer[offset:end].tobytes())
+    numbers.byteswap()
+    return memoryview(numbers), end
+
+
+def dump(file, names, terms, non_terms, start_symbol, productions):
+    """Запись грамматики в двоичном формате.
+    names - имена символов по их номерам, terms и non_terms - номера символов,
+    start_symbol - номер стартового символа или None,
+    productions - пары (левая часть, правая часть) из номеров символов"""
+    lefts = array('I')
+    right_offsets = array('I', [0])
+    rights = array('I')
+    for left, right in productions:
+        lefts.append(left)
+        rights.extend(right)
+        right_offsets.append(len(rights))
+
+    encoded_names = [name.encode('utf-8') for name in names]
+    name_offsets = array('I', [0])
+    for name in encoded_names:
+        name_offsets.append(name_offsets[-1] + len(name))
+    names_blob = b''.join(encoded_names)
+    names_blob += b'\0' * (-len(names_blob) % 4)
+
+    file.write(_HEADER.pack(MAGIC, VERSION, 0, len(names), len(terms), len(non_terms),
+                            NO_SYMBOL if start_symbol is None else start_symbol,
+                            len(lefts), len(rights)))
+    file.write(_to_bytes(name_offsets))
+    file.write(names_blob)
+    file.write(_to_bytes(terms))
+    file.write(_to_bytes(non_terms))
+    file.write(_to_bytes(lefts))
+    file.write(_to_bytes(right_offsets))
+    file.write(_to_bytes(rights))
+
+
+def _copy_array(numbers):
+    copy = array('I')
+    with numbers.cast('B') as data:
+        copy.frombytes(data)
+    return copy
+
+
+def load(filename):
+    """Чтение грамматики, записанной функцией dump. Файл отображается в
+    память, массивы читаются без промежуточного копирования, продукции
+    копируются в массивы целиком, без создания объекта на каждую продукцию.
+    Возвращает (names, terms, non_terms, start_symbol, productions), где
+    productions - массивы (левые части, смещения правых частей, символы
+    правых частей), см. ProductionIndex.packed"""
+    with open(filename, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buffer = memoryview(mapped)
+            try:
+                return _load_buffer(buffer)
+            finally:
+                buffer.release()
+
+
+def _load_buffer(buffer):
+    if len(buffer) < _HEADER.size:
+        raise ValueError('Unexpected end of binary file')
+
+    magic, version, _, n_symbols, n_terms, n_non_terms, start_symbol, n_productions, n_rights = \
+        _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('Not a binary grammar file')
+    if version != VERSION:
+        raise ValueError('Unsupported binary grammar version ' + str(version))
+
+    views = []
+    try:
+        name_offsets, offset = _from_buffer(buffer, _HEADER.size, n_symbols + 1)
+        views.append(name_offsets)
+        names_size = name_offsets[-1]
+        names_blob = buffer[offset:offset + names_size]
+        views.append(names_blob)
+        names = [str(names_blob[name_offsets[i]:name_offsets[i + 1]], 'utf-8') for i in range(n_symbols)]
+        offset += names_size + (-names_size % 4)
+
+        arrays = []
+        for count in (n_terms, n_non_terms, n_productions, n_productions + 1, n_rights):
+            numbers, offset = _from_buffer(buffer, offset, count)
+            views.append(numbers)
+            arrays.append(numbers)
+        terms, non_terms, lefts, right_offsets, rights = arrays
+
+        for numbers in (terms, non_terms, lefts, rights):
+            if len(numbers) > 0 and max(numbers) >= n_symbols:
+                raise ValueError('Invalid symbol number')
+        if start_symbol != NO_SYMBOL and start_symbol >= n_symbols:
+            raise ValueError('Invalid symbol number')
+
+        if right_offsets[0] != 0 or right_offsets[-1] != n_rights:
+            raise ValueError('Invalid right part offsets')
+
+        productions = (_copy_array(lefts), _copy_array(right_offsets), _copy_array(rights))
+        return (names, list(terms), list(non_terms),
+                None if start_symbol == NO_SYMBOL else start_symbol, productions)
+    finally:
+        for view in views:
+            view.release()
@@ -0,0 +1,158 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+
+# Меняется при изменении преобразований или формата ключа, чтобы старые
+# результаты не использовались
+CACHE_VERSION = 2
+
+# Параметры, которые влияют только на способ выполнения преобразования, но не
+# на результат, и не входят в ключ
+EXECUTION_PARAMETERS = ('jobs', 'chunk_size')
+
+
+class TransformationCache:
+    """Кэш результатов преобразований грамматик на локальном диске.
+
+    Ключ - хеш SHA-256 от терминалов, нетерминалов, стартового символа,
+    продукций, имени операции и ее аргументов. Результат хранится в двоичном
+    формате (Grammar.save_binary). При превышении max_size байт удаляются
+    записи, которые дольше всего не использовались (время последнего
+    использования - время изменения файла). Общий размер записей
+    учитывается при каждом сохранении, каталог просматривается заново
+    только при превышении max_size"""
+
+    SUFFIX = '.bin'
+
+    def __init__(self, directory, max_size=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Общий размер записей, None - неизвестен
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, grammar, operation, args=(), kwargs=None):
+        data = [CACHE_VERSION, operation, list(args), sorted((kwargs or {}).items()),
+                grammar.terms, grammar.non_terms, grammar.start_symbol]
+        digest = hashlib.sha256()
+        digest.update(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        digest.update(json.dumps(grammar.productions, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key, grammar):
+        """Загрузка результата в grammar. Возвращает False, если результата нет"""
+        filename = self._filename(key)
+        try:
+            grammar.load_binary(filename)
+            os.utime(filename)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except BaseException:
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        return True
+
+    def store(self, key, grammar):
+        # Запись во временный файл и переименование, чтобы параллельные
+        # процессы не прочитали файл частично
+        file, temp_filename = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(file)
+        try:
+            grammar.save_binary(temp_filename)
+            size = os.path.getsize(temp_filename)
+            os.replace(temp_filename, self._filename(key))
+        except BaseException:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+
+        # Замененная запись и записи других процессов учитываются при
+        # следующем просмотре каталога
+        if self._size is None:
+            self._size = sum(x[1] for x in self._entries())
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        size = sum(x[1] for x in entries)
+        for _, entry_size, filename in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def clear(self):
+        for _, _, filename in self._entries():
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+        self._size = None
+
+    def stats(self):
+        entries = self._entries()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(entries), 'size': sum(x[1] for x in entries)}
+
+
+def cached(method):
+    """Декоратор метода Grammar: если задан grammar.cache, результат
+    преобразования берется из кэша (без проверки грамматики и самого
+    преобразования) или сохраняется в него. Вложенные вызовы кэшированных
+    методов выполняются без обращения к кэшу. Аргументы приводятся к
+    именованным со значениями по умолчанию, поэтому f(1), f(x=1) и f() при
+    x=1 по умолчанию дают один ключ; EXECUTION_PARAMETERS в ключ не входят"""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.cache
+        if cache is None or self._in_cached_call:
+            return method(self, *args, **kwargs)
+
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        key = cache.key(self, method.__name__, kwargs={name: value for name, value in arguments.arguments.items()
+                                                       if name != 'self' and name not in EXECUTION_PARAMETERS})
+        if cache.load(key, self):
+            return None
+
+        self._in_cached_call = True
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            self._in_cached_call = False
+        cache.store(key, self)
+        return result
+
+    return wrapper
@@ -9,6 +9,7 @@ class BaseConfig:
     EPSILON_SYMBOL = 'ε'
     EPSILON_SIGN = ':eps:'
     HATCH_SYMBOL = "'"
+    END_SYMBOL = '$'
 
 
 class TestConfig:
@@ -0,0 +1,140 @@
+import numpy
+
+from grammar import Grammar
+
+
+class CYKRecognizer:
+    """Распознаватель Кока-Янгера-Касами для грамматики в нормальной форме
+    Хомского (см. Grammar.to_cnf).
+
+    Таблица разбора хранится по позициям цепочки: для нетерминала A и
+    позиции i - строка битов по позициям k, упакованная в слова uint64. Бит
+    k > i означает, что из A выводится подцепочка w[i:k], бит k < i - что
+    выводится w[k:i]. Так обе треугольные половины таблицы (по началу и по
+    концу подцепочки) занимают одну битовую матрицу (n + 1) x (n + 1) на
+    нетерминал. Подцепочка w[i:j] выводится по продукции A->BC, если у
+    строки i для B и строки j для C есть общий бит k, i < k < j, поэтому для
+    всех начал подцепочек одной длины и всех разбиений продукция
+    применяется одной операцией AND над упакованными строками"""
+
+    def __init__(self, grammar):
+        grammar._check_grammar()
+        symbols = grammar._symbols
+        self.non_terms = list(grammar.non_terms)
+        rows = {symbols.intern(x): i for i, x in enumerate(self.non_terms)}
+        self._start = rows[symbols.intern(grammar.start_symbol)]
+        self.accepts_empty = False
+
+        # Терминал -> нетерминалы A с продукцией A->a
+        terminal_rules = {}
+        # Левый нетерминал B -> список (правый нетерминал C, нетерминал A) продукций A->BC
+        binary_rules = {}
+        for left, right in grammar._productions:
+            if right == (grammar._eps,) and rows.get(left) == self._start:
+                self.accepts_empty = True
+            elif len(right) == 1 and right[0] not in rows and right[0] != grammar._eps:
+                terminal_rules.setdefault(symbols.name(right[0]), []).append(rows[left])
+            elif len(right) == 2 and right[0] in rows and right[1] in rows:
+                binary_rules.setdefault(rows[right[0]], []).append((rows[right[1]], rows[left]))
+            else:
+                raise BaseException('Grammar must be in Chomsky normal form')
+
+        # Строка 0 - пустое множество для неизвестных терминалов
+        self._columns = {x: i + 1 for i, x in enumerate(terminal_rules)}
+        self._terminal_rules = numpy.zeros((len(terminal_rules) + 1, len(self.non_terms)), dtype=bool)
+        for terminal, parents in terminal_rules.items():
+            self._terminal_rules[self._columns[terminal], parents] = True
+        self._binary_rules = sorted((left_child, sorted(set(rules))) for left_child, rules in binary_rules.items())
+
+    def encode(self, tokens):
+        get = self._columns.get
+        return numpy.array([get(x, 0) for x in tokens], dtype=numpy.int64)
+
+    def chart_bytes(self, n):
+        """Объем таблицы разбора для одной цепочки длины n в байтах"""
+        return (len(self.non_terms) + 1) * (n + 1) * (n // 64 + 1) * 8
+
+    def _recognize_encoded(self, codes):
+        """Распознавание цепочек одинаковой длины n > 0, codes - массив
+        (число цепочек, n). Возвращает массив bool по цепочкам"""
+        count, n = codes.shape
+        positions = numpy.arange(n + 1)
+        word_of = positions // 64
+        bit_of = (positions % 64).astype(numpy.uint64)
+        words = n // 64 + 1
+        chart = numpy.zeros((len(self.non_terms), count, n + 1, words), dtype=numpy.uint64)
+
+        def add_spans(parent, hits, begins, ends):
+            # hits[c, x] - из parent выводится w[begins[x]:ends[x]] в цепочке c
+            bits = hits.astype(numpy.uint64)
+            chart[parent, :, begins, word_of[ends]] |= (bits << bit_of[ends]).T
+            chart[parent, :, ends, word_of[begins]] |= (bits << bit_of[begins]).T
+
+        # Биты строки i, соответствующие позициям k > i
+        above = numpy.where(numpy.arange(words) > word_of[:, None], ~numpy.uint64(0), numpy.uint64(0))
+        above[positions, word_of] = ~((numpy.uint64(2) << bit_of) - numpy.uint64(1))
+
+        cells = self._terminal_rules[codes]
+        for parent in numpy.flatnonzero(cells.any(axis=(0, 1))):
+            add_spans(parent, cells[:, :, parent], positions[:n], positions[1:])
+
+        for length in range(2, n + 1):
+            starts = n - length + 1
+            found = {}
+            for left_child, rules in self._binary_rules:
+                # Строки начал i: только подцепочки w[i:k], правые части
+                # разбиений берутся из строк концов j = i + length
+                left = chart[left_child, :, :starts] & above[:starts]
+                for right_child, parent in rules:
+                    hits = (left & chart[right_child, :, length:]).any(axis=-1)
+                    if parent in found:
+                        found[parent] |= hits
+                    else:
+                        found[parent] = hits
+            for parent, hits in found.items():
+                if hits.any():
+                    add_spans(parent, hits, positions[:starts], positions[length:])
+
+        return ((chart[self._start, :, 0, word_of[n]] >> bit_of[n]) & numpy.uint64(1)).astype(bool)
+
+    def recognize(self, tokens):
+        return self.recognize_batch([tokens])[0]
+
+    def recognize_batch(self, sentences, batch_size=None, memory_limit=256 * 1024 * 1024):
+        """Распознавание множества цепочек. Цепочки одинаковой длины
+        обрабатываются вместе: за раз - столько, сколько таблиц разбора
+        (см. chart_bytes) умещается в memory_limit байт, но не более
+        batch_size, и не менее одной. Возвращает список результатов"""
+        results = [False] * len(sentences)
+        by_length = {}
+        for i, tokens in enumerate(sentences):
+            by_length.setdefault(len(tokens), []).append(i)
+
+        for length, indexes in by_length.items():
+            if length == 0:
+                for i in indexes:
+                    results[i] = self.accepts_empty
+                continue
+
+            size = max(1, memory_limit // self.chart_bytes(length))
+            if batch_size is not None:
+                size = min(size, batch_size)
+            for begin in range(0, len(indexes), size):
+                batch = indexes[begin:begin + size]
+                codes = numpy.array([self.encode(sentences[i]) for i in batch], dtype=numpy.int64)
+                for i, accepted in zip(batch, self._recognize_encoded(codes)):
+                    results[i] = bool(accepted)
+        return results
+
+
+def recognize(grammar, sentences):
+    """Проверка принадлежности цепочек языку грамматики без ее изменения:
+    распознаватель строится по копии грамматики, приведенной к нормальной
+    форме Хомского"""
+    cnf = Grammar()
+    cnf.terms = list(grammar.terms)
+    cnf.non_terms = list(grammar.non_terms)
+    cnf.start_symbol = grammar.start_symbol
+    cnf.productions = grammar.productions
+    cnf.to_cnf()
+    return CYKRecognizer(cnf).recognize_batch(sentences)
@@ -1,8 +1,23 @@
-import json
 import itertools
-import os
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
+import binary_format
+import instrumentation
+from cache import cached
 from config import BaseConfig
+from graph import strongly_connected_components
+from incremental import IncrementalState
+from instrumentation import instrumented
+from json_stream import JsonStreamReader
+from prefix_trie import PrefixTrie
+from production_index import ProductionIndex
+from production_list import ProductionList
+from symbols import SymbolList, SymbolTable
+
+# Перевод символов '0' и '1' в байты 0 и 1
+_BINARY_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
 
 
 class Grammar:
@@ -10,223 +25,618 @@ class Grammar:
         self.terms = []
         self.non_terms = []
         self.start_symbol = None
-        self.productions = []
+        # Продукции хранятся в виде кортежей номеров символов из self._symbols,
+        # перевод в строки выполняется только при вводе и выводе
+        self._symbols = SymbolTable([BaseConfig.EPSILON_SYMBOL])
+        self._eps = self._symbols.get(BaseConfig.EPSILON_SYMBOL)
+        self._productions = ProductionIndex()
+        # Кэш результатов преобразований (TransformationCache) или None
+        self.cache = None
+        self._in_cached_call = False
+        # Запомненные производные данные: имя -> (ключ версии грамматики, значение)
+        self._derived = {}
+        # Грамматика уже проверена (GrammarPipeline), _check_grammar не выполняется
+        self._validated = False
+        # Данные, обновляемые при правках (IncrementalState) или None
+        self._state = None
+        # Имена, которые не выбираются для новых нетерминалов, кроме имен
+        # символов грамматики (см. _unique_hatch_name, _process_symbol_group)
+        self._reserved_names = ()
+
+    @property
+    def productions(self):
+        """Продукции в виде списка [[A, [X1, ..., Xn]], ...]. Список строится
+        при каждом обращении, его изменения записываются в грамматику (см.
+        ProductionList)"""
+        name, names = self._symbols.name, self._symbols.names
+        return ProductionList(self, ((name(left), names(right)) for left, right in self._productions))
+
+    @productions.setter
+    def productions(self, productions):
+        intern = self._symbols.intern
+        new_productions = ProductionIndex()
+        for production in productions:
+            if isinstance(production[0], list):
+                raise BaseException('Grammar must be context free')
+            new_productions.add(intern(production[0]), tuple(map(intern, production[1])))
+
+        self._productions = new_productions
+
+    @property
+    def terms(self):
+        """Список терминалов. Присвоенный список копируется в SymbolList,
+        поэтому изменения списка grammar.terms учитываются в проверках
+        принадлежности, а изменения присвоенного исходного списка - нет"""
+        return self._terms
+
+    @terms.setter
+    def terms(self, names):
+        self._terms = names if isinstance(names, SymbolList) else SymbolList(names)
+
+    @property
+    def non_terms(self):
+        """Список нетерминалов (см. terms)"""
+        return self._non_terms
+
+    @non_terms.setter
+    def non_terms(self, names):
+        self._non_terms = names if isinstance(names, SymbolList) else SymbolList(names)
+
+    def _current_state(self):
+        """IncrementalState, если после последней правки грамматика не
+        изменялась другим способом, иначе None"""
+        state = self._state
+        if state is not None and state.matches(self):
+            return state
+        return None
+
+    def _edit_state(self):
+        state = self._current_state()
+        if state is None:
+            state = self._state = IncrementalState(self)
+        return state
+
+    def add_symbol(self, symbol, is_term=False):
+        """Добавление терминала (is_term) или нетерминала symbol"""
+        state = self._edit_state()
+        symbol_id = self._symbols.intern(symbol)
+        if symbol_id in state.terms or symbol_id in state.non_terms:
+            raise BaseException('Symbol already exists')
+
+        (self.terms if is_term else self.non_terms).append(symbol)
+        state.add_symbol(symbol_id, is_term)
+        state.stamp(self)
+
+    def add_production(self, left, right):
+        """Добавление продукции left->right (right - список имен символов).
+        Данные для проверок _check_grammar, _check_eps_productions,
+        _check_cycles, _check_left_recursion_direct и множество нетерминалов,
+        выводящих ε, обновляются за время, пропорциональное правке"""
+        state = self._edit_state()
+        intern = self._symbols.intern
+        left, right = intern(left), tuple(map(intern, right))
+        self._productions.add(left, right)
+        state.add_production(left, right)
+        state.stamp(self)
+
+    def remove_production(self, left, right):
+        """Удаление продукции left->right (см. add_production)"""
+        state = self._edit_state()
+        left, right = self._symbols.get(left), tuple(map(self._symbols.get, right))
+        if not self._productions.remove(left, right):
+            raise BaseException('Production does not exist')
+        state.remove_production(left, right)
+        state.stamp(self)
+
+    def _replace_productions(self, productions):
+        """Замена продукций грамматики списком кортежей productions. Если
+        продукции совпадают с текущими, хранилище (и его версия) остается
+        прежним, поэтому преобразование, которому нечего делать, не
+        считается изменившим грамматику (см. GrammarPipeline)"""
+        if len(productions) != len(self._productions) or \
+                any(x != y for x, y in zip(productions, self._productions.view())):
+            self._productions = ProductionIndex(productions)
+
+    def _derived_key(self):
+        return self._productions.version, tuple(self.terms), tuple(self.non_terms), self.start_symbol
+
+    def _get_derived(self, name, compute):
+        """Значение, вычисленное по грамматике функцией compute, с запоминанием.
+        Запомненное значение сбрасывается при изменении продукций или символов"""
+        key = self._derived_key()
+        derived = self._derived.get(name)
+        if derived is not None and derived[0] == key:
+            return derived[1]
+
+        value = compute()
+        self._derived[name] = (key, value)
+        return value
+
+    def _set_derived(self, name, value):
+        """Запоминание значения, уже известного после преобразования, чтобы
+        не вычислять его заново"""
+        self._derived[name] = (self._derived_key(), value)
+
+    def _production_to_str(self, production):
+        return self._symbols.name(production[0]) + '->' + ''.join(self._symbols.names(production[1]))
+
+    def _check_grammar(self, check_productions=True):
+        if self._validated:
+            return
+
+        state = self._current_state()
+        if state is not None:
+            state.check_grammar(self, self._symbols, check_productions)
+            return
 
-    def _check_grammar(self):
         if not self.start_symbol or len(self.terms) < 1 or \
-                len(self.non_terms) < 1 or len(self.productions) < 1:
+                len(self.non_terms) < 1 or len(self._productions) < 1:
             raise BaseException('Grammar is empty')
 
-        if self.start_symbol not in self.non_terms:
+        if self.start_symbol not in self.non_terms.names():
             raise BaseException('Grammar is incorrect')
 
-        if len(set(self.terms) & set(self.non_terms)) > 0:
+        if not self.terms.names().isdisjoint(self.non_terms.names()):
             raise BaseException('Grammar is incorrect')
 
-        for production in self.productions:
-            if isinstance(production[0], list):
-                raise BaseException('Grammar must be context free')
+        if not check_productions:
+            return
 
-            if production[0] not in self.non_terms:
+        non_terms = set(map(self._symbols.get, self.non_terms))
+        for production in self._productions:
+            if production[0] not in non_terms:
                 raise BaseException('Grammar is incorrect')
 
     def _check_eps_productions(self):
-        for production in self.productions:
-            if BaseConfig.EPSILON_SYMBOL in production[1]:
+        state = self._current_state()
+        if state is not None:
+            return state.eps_productions > 0
+
+        for production in self._productions:
+            if self._eps in production[1]:
                 return True
         return False
 
-    def _check_cycles(self):
-        cycle_list = []
-        for i, symbol in enumerate(self.non_terms):
-            check_list = []
-            cycle_list.append([symbol])
-            while check_list != cycle_list[i]:
-                check_list = cycle_list[i].copy()
-                for production in self.productions:
-                    if production[0] in cycle_list[i] and len(production[1]) == 1:
-                        if production[1][0] in self.non_terms and production[1][0] not in cycle_list[i]:
-                            cycle_list[i].append(production[1][0])
-
-            cycle_list[i].pop(0)
-            if len(cycle_list[i]) > 0:
-                return True
+    def _get_unit_graph(self):
+        """Граф цепных продукций: для каждого нетерминала A - нетерминалы B,
+        для которых есть продукция вида A->B"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        graph = {symbol: {} for symbol in non_terms}
+        state = self._current_state()
+        if state is not None:
+            graph.update((left, dict(edges)) for left, edges in state.unit_graph.items())
+            return graph
+
+        for left, right in self._productions:
+            if len(right) == 1 and right[0] in non_terms:
+                graph.setdefault(left, {})[right[0]] = None
+        return graph
+
+    @instrumented
+    def find_cycles(self):
+        """Поиск циклов вида A=>+A, построенных из цепных продукций.
+        Каждый цикл - компонента сильной связности графа цепных продукций
+        (нетерминалы перечислены в порядке self.non_terms)"""
+        return [list(x) for x in self._get_derived('cycles', self._find_cycles)]
+
+    def _find_cycles(self):
+        graph = self._get_unit_graph()
+        order = {symbol: i for i, symbol in enumerate(self.non_terms)}
+        instrumentation.count('cycle_iterations', len(graph) + sum(map(len, graph.values())))
+
+        cycles = []
+        for component in strongly_connected_components(graph):
+            if len(component) > 1 or component[0] in graph[component[0]]:
+                component = self._symbols.names(component)
+                cycles.append(sorted(component, key=lambda x: order.get(x, len(order))))
+
+        return sorted(cycles, key=lambda x: order.get(x[0], len(order)))
 
-        return False
+    def _check_cycles(self):
+        state = self._current_state()
+        if state is not None:
+            return state.has_cycles()
+        return len(self._get_derived('cycles', self._find_cycles)) > 0
 
     def _check_left_recursion_direct_symbol(self, symbol):
         """Проверка, есть ли хотя бы одна продукция вида A->Aα по
         заданному A"""
-        for production in self.productions:
-            if production[0] == symbol and production[1][0] == symbol:
-                return True
-        return False
+        symbol = self._symbols.intern(symbol)
+        return self._productions.has_left_first(symbol, symbol)
 
     def _check_left_recursion_direct(self):
         """Проверка, есть ли хотя бы одна продукция вида A->Aα
         для всех A из множества нетерминалов"""
+        state = self._current_state()
+        if state is not None:
+            return len(state.left_recursive) > 0
+
         for symbol in self.non_terms:
             if self._check_left_recursion_direct_symbol(symbol):
                 return True
         return False
 
+    def _hatch_groups(self, symbols):
+        """Разбиение списка нетерминалов на группы, которые можно обрабатывать
+        независимо: обработка A изменяет только продукции A и добавляет
+        нетерминалы с новыми именами вида A', A'', ..., поэтому нетерминалы
+        с общим корнем (см. _hatch_root) попадают в одну группу. Группа -
+        список позиций в symbols, группы упорядочены по первой позиции"""
+        groups = {}
+        for i, symbol in enumerate(symbols):
+            groups.setdefault(_hatch_root(symbol), []).append(i)
+        return list(groups.values())
+
+    def _process_symbols_parallel(self, operation, symbols, jobs, chunk_size):
+        """Обработка нетерминалов symbols операцией operation (см.
+        _process_symbol_group) в пуле из jobs процессов. Группы (см.
+        _hatch_groups) отправляются процессам по chunk_size за раз. Каждая
+        обработка нетерминала A удаляет продукции A и добавляет новые в конец,
+        поэтому результаты применяются в порядке symbols так же, как при
+        последовательной обработке, и грамматика получается та же. Процессу
+        передаются занятые имена с тем же корнем, что и у группы: терминалы,
+        нетерминалы и символы продукций других групп, чтобы новые имена
+        нетерминалов выбирались так же, как в _unique_hatch_name без пула.
+        Возвращает для каждого нетерминала список добавленных при его
+        обработке нетерминалов или None, если его продукции не изменились"""
+        name, names = self._symbols.name, self._symbols.names
+        # Корень -> {имя: None} для терминалов и нетерминалов и
+        # корень -> {символ: число вхождений} для символов продукций
+        taken_names = {}
+        for symbol_name in itertools.chain(self.terms, self.non_terms):
+            taken_names.setdefault(_hatch_root(symbol_name), {})[symbol_name] = None
+        taken_symbols = {}
+        for symbol, count in self._productions.symbol_counts().items():
+            taken_symbols.setdefault(_hatch_root(name(symbol)), {})[symbol] = count
+
+        groups = self._hatch_groups(symbols)
+        tasks = []
+        for group in groups:
+            group_symbols = [symbols[i] for i in group]
+            productions = []
+            for symbol in dict.fromkeys(group_symbols):
+                productions.extend(self._productions.get_left(self._symbols.intern(symbol)))
+
+            # Вхождения в продукции группы процесс учитывает сам
+            root = _hatch_root(group_symbols[0])
+            symbol_counts = dict(taken_symbols.get(root, {}))
+            for left, right in productions:
+                for symbol in (left,) + right:
+                    if symbol in symbol_counts:
+                        symbol_counts[symbol] -= 1
+            taken = list(taken_names.get(root, ()))
+            taken.extend(name(symbol) for symbol, count in symbol_counts.items() if count > 0)
+            tasks.append((operation, group_symbols, [[name(left), names(right)] for left, right in productions],
+                          taken))
+
+        results = [None] * len(symbols)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for group, group_results in zip(groups, executor.map(_process_symbol_group, tasks,
+                                                                 chunksize=chunk_size)):
+                for i, result in zip(group, group_results):
+                    results[i] = result
+
+        intern = self._symbols.intern
+        for symbol, result in zip(symbols, results):
+            if result is not None:
+                productions, new_symbols = result
+                self._productions.pop_left(intern(symbol))
+                for new_symbol in new_symbols:
+                    intern(new_symbol)
+                self._productions.extend((intern(left), tuple(map(intern, right))) for left, right in productions)
+        return [x and x[1] for x in results]
+
     def _pop_symbol_productions(self, symbol):
         """Удаление текущих продукций вида A->γ по заданному A
         и возврат их в виде списка"""
-        if symbol not in self.non_terms:
+        if symbol not in self.non_terms.names():
             raise BaseException('Symbol must be nonterminal')
 
-        new_productions = []
-        symbol_productions = []
-        for production in self.productions:
-            if production[0] == symbol:
-                symbol_productions.append(production)
-            else:
-                new_productions.append(production)
-
-        self.productions = list(new_productions)
-        return symbol_productions
+        return self._productions.pop_left(self._symbols.intern(symbol))
 
     def _pop_left_right_productions(self, left, right):
         """Удаление текущих продукций вида A->Bγ по заданным
         A и B и возврат их в виде списка"""
-        if left not in self.non_terms or right not in self.non_terms:
+        non_terms = self.non_terms.names()
+        if left not in non_terms or right not in non_terms:
             raise BaseException('Symbol must be nonterminal')
 
-        new_productions = []
-        symbol_productions = []
-        for production in self.productions:
-            if production[0] == left and production[1][0] == right:
-                symbol_productions.append(production)
-            else:
-                new_productions.append(production)
-
-        self.productions = list(new_productions)
-        return symbol_productions
+        return self._productions.pop_left_first(self._symbols.intern(left), self._symbols.intern(right))
 
     def _get_symbol_productions(self, symbol):
-        if symbol not in self.non_terms:
-            raise BaseException('Symbol must be nonterminal')
-
-        symbol_productions = []
-        for production in self.productions:
-            if production[0] == symbol:
-                symbol_productions.append(production)
-
-        return symbol_productions
-
-    def _get_max_prefix(self, symbol):
-        """Поиск самого длинного общего префикса для двух или более продукций, в
-         левой части которых находится нетерминал symbol"""
-
-        if symbol not in self.non_terms:
+        if symbol not in self.non_terms.names():
             raise BaseException('Symbol must be nonterminal')
 
-        # Правые части продукций, в левой части которых находится symbol
-        right_parts = [x[1] for x in self._get_symbol_productions(symbol)]
-
-        # Поиск всех возможных комбинаций правых частей продукций
-        combinations = []
-        for i in range(2, len(right_parts) + 1):
-            for j in itertools.combinations(right_parts, i):
-                combinations.append(list(j))
+        return self._productions.get_left(self._symbols.intern(symbol))
+
+    def _left_factoring_symbol(self, symbol, ranks):
+        """Левая факторизация продукций, в левой части которых находится
+        нетерминал symbol. Префиксное дерево правых частей строится один раз
+        и обновляется после каждого вынесения общего префикса.
+        ranks - порядок символов (см. SymbolTable.ranks).
+        Возвращает список новых нетерминалов вида A', A'', ... - по одному
+        на каждый вынесенный префикс"""
+        trie = PrefixTrie(x[1] for x in self._get_symbol_productions(symbol))
+        max_prefix = trie.max_prefix(key=ranks.__getitem__)
+        if max_prefix is None:
+            return []
+
+        # Символы удаленных продукций входят в новые, поэтому их имена заняты
+        chosen = set(self._symbols.names({x for _, right in self._pop_symbol_productions(symbol) for x in right}))
+        hatch_names = []
+        name = symbol
+        symbol = self._symbols.intern(symbol)
 
-        # Поиск самого длинного общего префикса для двух или более
-        # продукций для каждой возможной комбинации
-        prefixes = []
-        for combination in combinations:
-            prefix = os.path.commonprefix(combination)
-            if len(prefix) > 0 and prefix not in prefixes:
-                prefixes.append(prefix)
+        new_productions = []
+        deduplicated = False
+        while max_prefix:
+            # Добавление нового нетерминала вида A' для каждого префикса
+            hatch_names.append(self._unique_hatch_name(name, chosen))
+            chosen.add(hatch_names[-1])
+            hatch_symbol = self._symbols.intern(hatch_names[-1])
+
+            for right_part in trie.pop_prefix(max_prefix):
+                # Часть тела продукции без общего префикса
+                without_prefix = right_part[len(max_prefix):]
+
+                if len(without_prefix) == 0:
+                    without_prefix = (self._eps,)
+
+                # Добавление новых продукций
+                new_productions.append((hatch_symbol, without_prefix))
+                new_productions.append((symbol, max_prefix + (hatch_symbol,)))
+
+            # Правые части без общего префикса возвращаются в грамматику
+            # без повторов
+            if not deduplicated:
+                trie.deduplicate()
+                deduplicated = True
+
+            max_prefix = trie.max_prefix(key=ranks.__getitem__)
+
+        self._productions.extend((symbol, x) for x in trie.right_parts())
+        self._productions.extend(new_productions)
+        instrumentation.count('trie_nodes', trie.nodes)
+        instrumentation.count('trie_nodes_visited', trie.visited)
+        return hatch_names
+
+    def _get_nullable_symbols(self):
+        """Получение множества нетерминалов, из которых выводится ε.
+        Для каждой продукции хранится число символов правой части, еще не
+        признанных выводящими ε; при обработке очередного такого нетерминала
+        уменьшаются счетчики только тех продукций, в которые он входит, поэтому
+        каждая продукция просматривается один раз"""
+        state = self._current_state()
+        if state is not None:
+            return set(state.nullable)
+
+        nullable = set()
+        worklist = []
+        # Символ -> номера продукций, в правую часть которых он входит (с повторами)
+        occurrences = {}
+        # Номер продукции -> (левая часть, число символов, еще не выводящих ε)
+        counters = []
+
+        for left, right in self._productions:
+            if right == (self._eps,):
+                right = ()
+
+            for symbol in right:
+                occurrences.setdefault(symbol, []).append(len(counters))
+            counters.append([left, len(right)])
+
+            if len(right) == 0 and left not in nullable:
+                nullable.add(left)
+                worklist.append(left)
+
+        iterations = 0
+        while worklist:
+            symbol = worklist.pop()
+            symbol_occurrences = occurrences.get(symbol, ())
+            iterations += len(symbol_occurrences)
+            for i in symbol_occurrences:
+                counter = counters[i]
+                counter[1] -= 1
+                if counter[1] == 0 and counter[0] not in nullable:
+                    nullable.add(counter[0])
+                    worklist.append(counter[0])
+
+        instrumentation.count('nullable_iterations', iterations)
+        return nullable
+
+    def _get_generating_symbols(self):
+        """Получение множества порождающих нетерминалов (из которых выводится
+        цепочка терминалов). Как и в _get_nullable_symbols, для каждой
+        продукции хранится число вхождений нетерминалов, еще не признанных
+        порождающими"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        generating = set()
+        worklist = []
+        occurrences = {}
+        counters = []
+
+        for left, right in self._productions:
+            count = 0
+            for symbol in right:
+                if symbol in non_terms:
+                    occurrences.setdefault(symbol, []).append(len(counters))
+                    count += 1
+            counters.append([left, count])
+
+            if count == 0 and left not in generating:
+                generating.add(left)
+                worklist.append(left)
+
+        while worklist:
+            symbol = worklist.pop()
+            for i in occurrences.get(symbol, ()):
+                counter = counters[i]
+                counter[1] -= 1
+                if counter[1] == 0 and counter[0] not in generating:
+                    generating.add(counter[0])
+                    worklist.append(counter[0])
+
+        return generating
+
+    def _get_reachable_symbols(self, generating):
+        """Получение множества нетерминалов, достижимых из стартового символа
+        по продукциям, все нетерминалы которых порождающие"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        start_symbol = self._symbols.intern(self.start_symbol)
+        reachable = {start_symbol}
+        worklist = [start_symbol]
+
+        while worklist:
+            for _, right in self._productions.get_left(worklist.pop()):
+                if not all(x in generating for x in right if x in non_terms):
+                    continue
+                for symbol in right:
+                    if symbol in non_terms and symbol not in reachable:
+                        reachable.add(symbol)
+                        worklist.append(symbol)
+
+        return reachable
+
+    @instrumented
+    @cached
+    def remove_useless_symbols(self):
+        """Удаление бесполезных нетерминалов: сначала непорождающих, затем
+        недостижимых из стартового символа, вместе с продукциями, в которые
+        они входят. Терминалы не удаляются"""
+        self._check_grammar()
 
-        if len(prefixes) == 0:
-            return None
+        generating = self._get_generating_symbols()
+        if self._symbols.intern(self.start_symbol) not in generating:
+            raise BaseException('Grammar generates no terminal strings')
 
-        return list(max(prefixes))
+        useful = self._get_reachable_symbols(generating)
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        useless = non_terms - useful
+        if len(useless) == 0:
+            return
 
-    def remove_eps_productions(self):
-        """Удаление эпсилон-продукций"""
+        self.non_terms = [x for x in self.non_terms if self._symbols.get(x) in useful]
+        self._productions = ProductionIndex(
+            production for production in self._productions
+            if production[0] in useful and not any(x in useless for x in production[1]))
+
+    @staticmethod
+    def _iter_eps_combinations(right_part, indexes):
+        """Ленивый перебор правых частей, полученных путем всех возможных
+        исключений символов с заданными индексами.
+        Пример: из S->AaB следуют комбинации S->aB, S->Aa, S->a"""
+        for i in range(1, len(indexes) + 1):
+            for combination in itertools.combinations(indexes, i):
+                excluded = set(combination)
+                yield tuple(symbol for j, symbol in enumerate(right_part) if j not in excluded)
+
+    @instrumented
+    @cached
+    def remove_eps_productions(self, max_combinations=None):
+        """Удаление эпсилон-продукций. max_combinations ограничивает число
+        комбинаций, порождаемых одной продукцией"""
         self._check_grammar()
 
         if not self._check_eps_productions():
             return
 
-        # Получение списка нетерминалов, стоящих в левой части продукций
-        # вида A->eps и удаление этих продукций
-        eps_list = []
-        for production in self.productions:
-            if len(production[1]) == 1 and BaseConfig.EPSILON_SYMBOL in production[1]:
-                if production[0] not in eps_list:
-                    eps_list.append(production[0])
-                del self.productions[self.productions.index(production)]
-
-        # Получение списка нетерминалов, стоящих в левой части продукций
-        # вида B->A, где каждый символ из А входит в eps_list
-        check_list = []
-        while eps_list != check_list:
-            check_list = eps_list.copy()
-            for production in self.productions:
-                if set(production[1]).issubset(set(eps_list)) and production[0] not in eps_list:
-                    eps_list.append(production[0])
+        eps_list = self._get_nullable_symbols()
 
         new_productions = []
-        for production in self.productions:
-            # Индексы нетерминалов из правой части этой продукции, которые есть в eps_list
-            delete_indexes = []
-            for i, symbol in enumerate(production[1]):
-                if symbol in eps_list:
-                    delete_indexes.append(i)
-
-            if len(delete_indexes) > 0:
-                if production not in new_productions:
-                    new_productions.append(production)
+        # Уже добавленные продукции, для отбрасывания дубликатов
+        added = set()
+        combinations = 0
+        for production in self._productions:
+            # Продукции вида A->eps удаляются
+            if production[1] == (self._eps,):
+                continue
+
+            if production not in added:
+                added.add(production)
+                new_productions.append(production)
 
-                # Комбинации, полученные путем всех возможных исключений нетерминалов
-                # из списка eps_list
-                # Пример: из S->AaB следуют комбинации S->AaB, S->aB, S->Aa, S->a
-                combinations = []
-                for i in range(1, len(delete_indexes) + 1):
-                    for j in itertools.combinations(delete_indexes, i):
-                        combinations.append(list(j))
+            # Индексы нетерминалов из правой части этой продукции, которые есть в eps_list
+            delete_indexes = [i for i, symbol in enumerate(production[1]) if symbol in eps_list]
+            if len(delete_indexes) == 0:
+                continue
 
-                for combination in combinations:
-                    combination = sorted(combination, reverse=True)
-                    new_right_part = list(production[1])
-                    for index in combination:
-                        del new_right_part[index]
+            if max_combinations is not None and 2 ** len(delete_indexes) - 1 > max_combinations:
+                raise BaseException('Too many combinations for production ' + self._production_to_str(production))
+            combinations += 2 ** len(delete_indexes) - 1
 
-                    new_production = [production[0], new_right_part]
+            for new_right_part in self._iter_eps_combinations(production[1], delete_indexes):
+                new_production = (production[0], new_right_part)
 
-                    # Не добавлять дубликаты и бессмысленные продукции типа A->A
-                    if new_production not in new_productions and len(new_production[1]) > 0:
-                        if len(new_production[1]) > 1 or (new_production[0] != new_production[1][0]):
-                            new_productions.append(new_production)
+                # Не добавлять дубликаты и бессмысленные продукции типа A->A
+                if len(new_right_part) == 0 or new_production in added:
+                    continue
+                if len(new_right_part) > 1 or production[0] != new_right_part[0]:
+                    added.add(new_production)
+                    new_productions.append(new_production)
 
-            else:
-                if production not in new_productions:
-                    new_productions.append(production)
+        instrumentation.count('eps_combinations', combinations)
 
         # Если стартовый символ S находится в eps_list, добавить новый
         # стартовый символ S' и продукции S'->S, S'->eps
-        if self.start_symbol in eps_list:
+        start_symbol = self._symbols.intern(self.start_symbol)
+        if start_symbol in eps_list:
             new_start_symbol = str(self.start_symbol) + BaseConfig.HATCH_SYMBOL
-            new_productions.append([new_start_symbol, [self.start_symbol]])
-            new_productions.append([new_start_symbol, [BaseConfig.EPSILON_SYMBOL]])
+            new_start_symbol_id = self._symbols.intern(new_start_symbol)
+            new_productions.append((new_start_symbol_id, (start_symbol,)))
+            new_productions.append((new_start_symbol_id, (self._eps,)))
             self.non_terms.append(new_start_symbol)
             self.start_symbol = new_start_symbol
 
-        self.productions = list(new_productions)
+        self._productions = ProductionIndex(new_productions)
+        # После преобразования ε выводится только из нового стартового символа
+        self._set_derived('nullable', {self._symbols.intern(self.start_symbol)} if start_symbol in eps_list else set())
+
+    @instrumented
+    @cached
+    def remove_cycles(self):
+        """Удаление циклов: нетерминалы каждого цикла заменяются одним из них
+        (стартовым символом, если он входит в цикл, иначе первым по порядку),
+        после чего отбрасываются продукции вида A->A и дубликаты"""
+        self._check_grammar()
+
+        cycles = self.find_cycles()
+        if len(cycles) == 0:
+            return
+
+        replacements = {}
+        for cycle in cycles:
+            symbol = self.start_symbol if self.start_symbol in cycle else cycle[0]
+            for replaced_symbol in cycle:
+                if replaced_symbol != symbol:
+                    replacements[self._symbols.intern(replaced_symbol)] = self._symbols.intern(symbol)
 
+        new_productions = []
+        added = set()
+        for left, right in self._productions:
+            production = (replacements.get(left, left), tuple(replacements.get(x, x) for x in right))
+            if production[1] == (production[0],) or production in added:
+                continue
+            added.add(production)
+            new_productions.append(production)
+
+        self.non_terms = [x for x in self.non_terms if self._symbols.get(x) not in replacements]
+        self._productions = ProductionIndex(new_productions)
+        self._set_derived('cycles', [])
+
+    @instrumented
+    @cached
     def remove_left_recursion_direct_symbol(self, symbol):
         """Удаление непосредственной левой рекурсии для нетерминала symbol"""
 
-        if symbol not in self.non_terms:
+        if symbol not in self.non_terms.names():
             raise BaseException('Symbol must be nonterminal')
 
         if not self._check_left_recursion_direct_symbol(symbol):
             return
 
+        hatch_name = self._unique_hatch_name(symbol)
         symbol_productions = self._pop_symbol_productions(symbol)
+        symbol = self._symbols.intern(symbol)
 
         new_productions = []
         alpha_list = []
@@ -243,26 +653,40 @@ class Grammar:
                 beta_list.append(production[1])
 
         # Добавление нового нетерминала вида A'
-        hatch_symbol = symbol + BaseConfig.HATCH_SYMBOL
+        hatch_symbol = self._symbols.intern(hatch_name)
 
         # Добавление новых продукций вида A-->βA' для каждого β
         for beta in beta_list:
-            new_right_part = list(beta)
-            new_right_part.append(hatch_symbol)
-            new_productions.append([symbol, new_right_part])
+            new_productions.append((symbol, beta + (hatch_symbol,)))
 
         # Добавление новых продукций вида A'-->αA' для каждого α
         for alpha in alpha_list:
-            new_right_part = list(alpha)
-            new_right_part.append(hatch_symbol)
-            new_productions.append([hatch_symbol, new_right_part])
+            new_productions.append((hatch_symbol, alpha + (hatch_symbol,)))
 
         # Добавление продукции вида A'->ε
-        new_productions.append([hatch_symbol, [BaseConfig.EPSILON_SYMBOL]])
+        new_productions.append((hatch_symbol, (self._eps,)))
+
+        self.non_terms.append(hatch_name)
+        self._productions.extend(new_productions)
+
+    @instrumented
+    @cached
+    def remove_left_recursion_direct(self, jobs=1, chunk_size=16):
+        """Удаление непосредственной левой рекурсии для всех нетерминалов.
+        jobs - число процессов (None - число процессоров): при jobs != 1
+        нетерминалы обрабатываются в пуле процессов, результат тот же"""
+        symbols = list(self.non_terms)
+        if jobs == 1:
+            for symbol in symbols:
+                self.remove_left_recursion_direct_symbol(symbol)
+            return
 
-        self.non_terms.append(hatch_symbol)
-        self.productions.extend(new_productions)
+        for new_symbols in self._process_symbols_parallel('remove_left_recursion_direct_symbol', symbols, jobs,
+                                                          chunk_size):
+            self.non_terms.extend(new_symbols or ())
 
+    @instrumented
+    @cached
     def remove_left_recursion_indirect(self, check_eps=True, check_cycles=True):
         if check_eps and self._check_eps_productions():
             raise BaseException('Remove eps productions first')
@@ -280,80 +704,515 @@ class Grammar:
                 new_productions = []
                 # Правые части продукций вида Ai->Ajγ (без Aj)
                 gamma_list = [x[1][1:] for x in self._pop_left_right_productions(non_terms[i], non_terms[j])]
+                if not gamma_list:
+                    continue
                 # Правые части всех продукций, в левой части которых находится Aj
                 delta_list = [x[1] for x in self._get_symbol_productions(non_terms[j])]
 
                 # Замена продукций
+                left = self._symbols.intern(non_terms[i])
                 for gamma in gamma_list:
                     for delta in delta_list:
-                        new_productions.append([non_terms[i], delta + gamma])
-                self.productions.extend(new_productions)
+                        new_productions.append((left, delta + gamma))
+                self._productions.extend(new_productions)
+                instrumentation.count('substitutions', len(new_productions))
             self.remove_left_recursion_direct_symbol(non_terms[i])
 
-    def left_factoring(self):
+    def _get_left_corner_graph(self):
+        """Граф левых углов: для каждого нетерминала A - нетерминалы B,
+        для которых есть продукция вида A->Bγ"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        return {symbol: {x: None for x in self._productions.get_left_firsts(symbol) if x in non_terms}
+                for symbol in map(self._symbols.intern, self.non_terms)}
+
+    def _get_left_recursion_order(self):
+        """Нетерминалы с левой рекурсией в порядке обработки, разбитые на
+        компоненты сильной связности графа левых углов. Компоненты
+        упорядочены по первому нетерминалу в self.non_terms, нетерминалы
+        внутри компоненты - по возрастанию числа левых углов из этой
+        компоненты (при равенстве - в порядке self.non_terms)"""
+        graph = self._get_left_corner_graph()
+        position = {symbol: i for i, symbol in enumerate(map(self._symbols.intern, self.non_terms))}
+
+        components = []
+        for component in strongly_connected_components(graph):
+            if len(component) == 1 and component[0] not in graph[component[0]]:
+                continue
+
+            members = set(component)
+            component.sort(key=lambda x: (sum(1 for y in graph[x] if y in members), position[x]))
+            components.append(component)
+
+        return sorted(components, key=lambda x: min(map(position.__getitem__, x)))
+
+    @instrumented
+    @cached
+    def remove_left_recursion_moore(self, check_eps=True, check_cycles=True, max_productions=None):
+        """Удаление левой рекурсии улучшенным алгоритмом (R. C. Moore,
+        Removing Left Recursion from Context-Free Grammars, 2000).
+
+        В отличие от remove_left_recursion_indirect, подстановка Ai->Ajγ
+        выполняется только для Aj из той же компоненты сильной связности графа
+        левых углов, что и Ai, и только для j < i, поэтому нетерминалы без
+        левой рекурсии не затрагиваются. max_productions ограничивает число
+        продукций грамматики: при превышении грамматика восстанавливается и
+        выбрасывается исключение с описанием подстановки"""
+        if check_eps and self._check_eps_productions():
+            raise BaseException('Remove eps productions first')
+
+        if check_cycles and self._check_cycles():
+            raise BaseException('Remove cycles first')
+
+        original_productions = list(self._productions)
+        original_non_terms = list(self.non_terms)
+        original_symbols = SymbolTable(self._symbols)
+        try:
+            for component in self._get_left_recursion_order():
+                for i, left in enumerate(component):
+                    for right in component[:i]:
+                        # Правые части продукций вида Ai->Ajγ (без Aj)
+                        gamma_list = [x[1][1:] for x in self._productions.pop_left_first(left, right)]
+                        if len(gamma_list) == 0:
+                            continue
+                        # Правые части всех продукций, в левой части которых находится Aj
+                        delta_list = [x[1] for x in self._productions.get_left(right)]
+
+                        count = len(self._productions) + len(gamma_list) * len(delta_list)
+                        if max_productions is not None and count > max_productions:
+                            raise BaseException(
+                                'Production budget exceeded: substituting ' + self._symbols.name(right) + ' (' +
+                                str(len(delta_list)) + ' productions) into ' + str(len(gamma_list)) +
+                                ' productions of ' + self._symbols.name(left) + ' gives ' + str(count) +
+                                ' productions, budget is ' + str(max_productions))
+
+                        self._productions.extend((left, delta + gamma) for gamma in gamma_list for delta in delta_list)
+                        instrumentation.count('substitutions', len(gamma_list) * len(delta_list))
+
+                    symbol = self._symbols.name(left)
+                    if max_productions is not None and self._check_left_recursion_direct_symbol(symbol) and \
+                            len(self._productions) + 1 > max_productions:
+                        raise BaseException('Production budget exceeded: removing direct left recursion of ' +
+                                            symbol + ' gives more than ' + str(max_productions) + ' productions')
+                    self.remove_left_recursion_direct_symbol(symbol)
+        except BaseException:
+            self._productions = ProductionIndex(original_productions)
+            self.non_terms = original_non_terms
+            # Имена нетерминалов, добавленных при неудачной попытке, освобождаются
+            self._symbols = original_symbols
+            raise
+
+    @instrumented
+    @cached
+    def left_factoring(self, jobs=1, chunk_size=16):
+        """Левая факторизация. jobs - число процессов (None - число
+        процессоров): при jobs != 1 нетерминалы обрабатываются в пуле
+        процессов, группами по chunk_size, результат тот же"""
         self._check_grammar()
 
+        if jobs == 1:
+            ranks = self._symbols.ranks()
+            hatch_symbols = [self._left_factoring_symbol(symbol, ranks) for symbol in self.non_terms]
+        else:
+            hatch_symbols = self._process_symbols_parallel('_left_factoring_symbol', self.non_terms, jobs,
+                                                           chunk_size)
+
+        # Имена новых нетерминалов уникальны (см. _unique_hatch_name)
+        new_non_terms = [x for new_symbols in hatch_symbols for x in new_symbols or ()]
+
+        # Продукции упорядочиваются по именам символов, а не по их номерам
+        rank = self._symbols.ranks().__getitem__
+        productions = sorted(self._productions.view(), key=lambda x: (rank(x[0]), tuple(map(rank, x[1]))))
+        self._replace_productions([production[0] for production in itertools.groupby(productions)])
+        self.non_terms.extend(new_non_terms)
+
+    def _unique_hatch_name(self, name, chosen=()):
+        """Имя нового нетерминала вида A', A'', ..., не совпадающее ни с одним
+        символом грамматики (терминалом, нетерминалом или символом продукций)
+        и ни с одним из уже выбранных имен chosen. Имена, которые были в
+        грамматике раньше, не учитываются, поэтому результат зависит только
+        от текущего состояния грамматики"""
+        counts = self._productions.symbol_counts()
+        name += BaseConfig.HATCH_SYMBOL
+        while name in self.terms.names() or name in self.non_terms.names() or name in self._reserved_names or name in chosen or \
+                self._symbols.get(name) in counts:
+            name += BaseConfig.HATCH_SYMBOL
+        return name
+
+    def _remove_unit_productions(self):
+        """Удаление цепных продукций A->B: каждый нетерминал A получает
+        нецепные продукции всех нетерминалов, достижимых из A по цепным
+        продукциям. Грамматика не должна содержать ε-продукций, кроме S->ε"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        graph = self._get_unit_graph()
+
+        new_productions = []
+        added = set()
+        for symbol in map(self._symbols.intern, self.non_terms):
+            reachable = {symbol: None}
+            stack = [symbol]
+            while stack:
+                for next_symbol in graph.get(stack.pop(), ()):
+                    if next_symbol not in reachable:
+                        reachable[next_symbol] = None
+                        stack.append(next_symbol)
+
+            for reachable_symbol in reachable:
+                for _, right in self._productions.get_left(reachable_symbol):
+                    production = (symbol, right)
+                    if (len(right) == 1 and right[0] in non_terms) or production in added:
+                        continue
+                    added.add(production)
+                    new_productions.append(production)
+
+        self._replace_productions(new_productions)
+
+    @instrumented
+    @cached
+    def to_cnf(self):
+        """Приведение к нормальной форме Хомского: все продукции имеют вид
+        A->BC или A->a, кроме S->ε для стартового символа S, который в этом
+        случае не входит в правые части. Выполняются удаление ε-продукций,
+        цепных продукций и бесполезных символов, затем терминалы в длинных
+        правых частях заменяются нетерминалами A'->a, а правые части длиннее
+        двух символов разбиваются на цепочки A->X1A', A'->X2A'', ...
+        (нетерминалы для одинаковых окончаний правых частей общие)"""
+        self._check_grammar()
+        self.remove_eps_productions()
+        self._remove_unit_productions()
+        self.remove_useless_symbols()
+
+        non_terms = set(map(self._symbols.intern, self.non_terms))
         new_non_terms = []
-        for symbol in self.non_terms:
-            new_productions = []
-            max_prefix = self._get_max_prefix(symbol)
-            while max_prefix:
-                right_parts = [x[1] for x in self._pop_symbol_productions(symbol)]
-                for right_part in right_parts:
-                    if ''.join(right_part).startswith(''.join(max_prefix)):
-                        # Часть тела продукции без общего префикса
-                        without_prefix = right_part[len(max_prefix):]
-
-                        if len(without_prefix) == 0:
-                            without_prefix = [BaseConfig.EPSILON_SYMBOL]
-
-                        # Добавление нового нетерминала вида A'
-                        hatch_symbol = symbol + BaseConfig.HATCH_SYMBOL
-
-                        if hatch_symbol not in new_non_terms:
-                            new_non_terms.append(hatch_symbol)
-
-                        # Добавление новых продукций
-                        new_productions.append([hatch_symbol, without_prefix])
-                        new_productions.append([symbol, list(max_prefix) + [hatch_symbol]])
-                    else:
-                        if [symbol, right_part] not in self.productions:
-                            self.productions.append([symbol, right_part])
-
-                max_prefix = self._get_max_prefix(symbol)
-            self.productions.extend(new_productions)
-
-        self.productions = [production[0] for production in itertools.groupby(sorted(self.productions))]
+        new_productions = []
+        # Терминал -> нетерминал A'->a
+        term_symbols = {}
+        # Окончание правой части -> нетерминал, из которого оно выводится
+        suffix_symbols = {}
+
+        # Новые имена попадают в продукции грамматики только в конце
+        chosen = set()
+
+        def add_symbol(name):
+            new_non_terms.append(self._unique_hatch_name(name, chosen))
+            chosen.add(new_non_terms[-1])
+            return self._symbols.intern(new_non_terms[-1])
+
+        productions = []
+        for left, right in self._productions:
+            if len(right) < 2:
+                productions.append((left, right))
+                continue
+
+            right = list(right)
+            for i, symbol in enumerate(right):
+                if symbol not in non_terms:
+                    if symbol not in term_symbols:
+                        term_symbols[symbol] = add_symbol(self._symbols.name(symbol))
+                        new_productions.append((term_symbols[symbol], (symbol,)))
+                    right[i] = term_symbols[symbol]
+
+            # Окончания строятся с конца: X(n-1)Xn, затем X(n-2)X(n-1)Xn и т.д.
+            for i in range(len(right) - 2, 0, -1):
+                suffix = tuple(right[i:])
+                if suffix not in suffix_symbols:
+                    suffix_symbols[suffix] = add_symbol(self._symbols.name(left))
+                    new_productions.append((suffix_symbols[suffix], (right[i], right[i + 1])))
+                right[i:] = [suffix_symbols[suffix]]
+            productions.append((left, tuple(right)))
+
+        self._replace_productions(productions + new_productions)
         self.non_terms.extend(new_non_terms)
 
+    def _compute_terminal_bits(self):
+        """Нумерация терминалов для битовых множеств FIRST и FOLLOW: терминалы
+        в порядке self.terms, затем символы правых частей, не объявленные ни
+        терминалами, ни нетерминалами, затем END_SYMBOL.
+        Возвращает (номер символа -> бит, номера символов в порядке битов)"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        order = list(dict.fromkeys(map(self._symbols.intern, self.terms)))
+        known = set(order)
+        for _, right in self._productions:
+            for symbol in right:
+                if symbol not in known and symbol not in non_terms and symbol != self._eps:
+                    known.add(symbol)
+                    order.append(symbol)
+
+        end_symbol = self._symbols.intern(BaseConfig.END_SYMBOL)
+        if end_symbol not in known:
+            order.append(end_symbol)
+
+        return {symbol: 1 << i for i, symbol in enumerate(order)}, order
+
+    def _bits_to_names(self, bits):
+        """Имена терминалов битового множества. Двоичная запись множества
+        переводится в байты 0/1 и используется как маска для списка имен,
+        поэтому разбор выполняется без цикла на Python"""
+        names = self._get_derived('terminal_names', lambda: self._symbols.names(
+            self._get_derived('terminal_bits', self._compute_terminal_bits)[1]))
+        return set(itertools.compress(names, bin(bits)[:1:-1].encode('ascii').translate(_BINARY_DIGITS)))
+
+    @staticmethod
+    def _propagate_bitsets(sets, dependents):
+        """Распространение битовых множеств по графу зависимостей:
+        sets[B] включается в sets[A] для каждого A из dependents[B].
+        Повторно обрабатываются только нетерминалы, множество которых изменилось"""
+        worklist = [symbol for symbol, bits in sets.items() if bits and symbol in dependents]
+        iterations = 0
+        while worklist:
+            symbol = worklist.pop()
+            iterations += 1
+            bits = sets[symbol]
+            for dependent in dependents[symbol]:
+                new_bits = sets[dependent] | bits
+                if new_bits != sets[dependent]:
+                    sets[dependent] = new_bits
+                    if dependent in dependents:
+                        worklist.append(dependent)
+
+        instrumentation.count('bitset_iterations', iterations)
+
+    def _compute_first_bitsets(self):
+        """FIRST(A) без ε для каждого нетерминала A в виде битового множества"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        bits = self._get_derived('terminal_bits', self._compute_terminal_bits)[0]
+        nullable = self._get_derived('nullable', self._get_nullable_symbols)
+
+        first = dict.fromkeys(non_terms, 0)
+        # B -> нетерминалы A, для которых FIRST(B) входит в FIRST(A)
+        dependents = {}
+        for left, right in self._productions:
+            for symbol in right:
+                if symbol == self._eps:
+                    continue
+                if symbol not in non_terms:
+                    first[left] |= bits[symbol]
+                    break
+                if symbol != left:
+                    dependents.setdefault(symbol, {})[left] = None
+                if symbol not in nullable:
+                    break
+
+        self._propagate_bitsets(first, dependents)
+        return first
+
+    def _compute_follow_bitsets(self):
+        """FOLLOW(A) для каждого нетерминала A в виде битового множества"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        bits = self._get_derived('terminal_bits', self._compute_terminal_bits)[0]
+        nullable = self._get_derived('nullable', self._get_nullable_symbols)
+        first = self._get_derived('first', self._compute_first_bitsets)
+
+        follow = dict.fromkeys(non_terms, 0)
+        follow[self._symbols.intern(self.start_symbol)] |= bits[self._symbols.intern(BaseConfig.END_SYMBOL)]
+        # A -> нетерминалы B, для которых FOLLOW(A) входит в FOLLOW(B)
+        dependents = {}
+        for left, right in self._productions:
+            # FIRST и выводимость ε для части правой части после текущего символа
+            suffix_first = 0
+            suffix_nullable = True
+            for symbol in reversed(right):
+                if symbol == self._eps:
+                    continue
+                if symbol not in non_terms:
+                    suffix_first = bits[symbol]
+                    suffix_nullable = False
+                    continue
+
+                follow[symbol] |= suffix_first
+                if suffix_nullable and symbol != left:
+                    dependents.setdefault(left, {})[symbol] = None
+
+                if symbol in nullable:
+                    suffix_first |= first[symbol]
+                else:
+                    suffix_first = first[symbol]
+                    suffix_nullable = False
+
+        self._propagate_bitsets(follow, dependents)
+        return follow
+
+    def _first_of_sequence_bits(self, symbols):
+        """FIRST для последовательности номеров символов: (битовое множество,
+        выводится ли из последовательности ε)"""
+        non_terms = set(map(self._symbols.intern, self.non_terms))
+        bits = self._get_derived('terminal_bits', self._compute_terminal_bits)[0]
+        nullable = self._get_derived('nullable', self._get_nullable_symbols)
+        first = self._get_derived('first', self._compute_first_bitsets)
+
+        result = 0
+        for symbol in symbols:
+            if symbol == self._eps:
+                continue
+            if symbol not in non_terms:
+                return result | bits[symbol], False
+            result |= first[symbol]
+            if symbol not in nullable:
+                return result, False
+        return result, True
+
+    @instrumented
+    def first_sets(self):
+        """Множества FIRST для всех нетерминалов. ε входит в FIRST(A),
+        если из A выводится ε"""
+        self._check_grammar()
+        first = self._get_derived('first', self._compute_first_bitsets)
+        nullable = self._get_derived('nullable', self._get_nullable_symbols)
+
+        first_sets = {}
+        for symbol in self.non_terms:
+            symbol_id = self._symbols.intern(symbol)
+            first_sets[symbol] = self._bits_to_names(first[symbol_id])
+            if symbol_id in nullable:
+                first_sets[symbol].add(BaseConfig.EPSILON_SYMBOL)
+        return first_sets
+
+    @instrumented
+    def follow_sets(self):
+        """Множества FOLLOW для всех нетерминалов, конец входа обозначается
+        END_SYMBOL"""
+        self._check_grammar()
+        follow = self._get_derived('follow', self._compute_follow_bitsets)
+        return {symbol: self._bits_to_names(follow[self._symbols.intern(symbol)]) for symbol in self.non_terms}
+
+    def first_of_sequence(self, symbols):
+        """Множество FIRST для последовательности символов грамматики"""
+        self._check_grammar()
+        for symbol in symbols:
+            if symbol not in self._symbols:
+                raise BaseException('Unknown symbol ' + str(symbol))
+
+        bits, nullable = self._first_of_sequence_bits([self._symbols.get(x) for x in symbols])
+        first = self._bits_to_names(bits)
+        if nullable:
+            first.add(BaseConfig.EPSILON_SYMBOL)
+        return first
+
     def load_from_json(self, filename):
+        """Загрузка грамматики из JSON-файла. Файл читается блоками, продукции
+        проверяются и переводятся в номера символов по мере чтения"""
         try:
             file = open(filename)
         except:
             raise FileNotFoundError('Unable to open JSON file')
 
-        try:
-            data = json.load(file)
-        except:
-            file.close()
-            raise BaseException('Unable to parse JSON file')
+        symbols = SymbolTable([BaseConfig.EPSILON_SYMBOL])
+        intern = symbols.intern
+        eps = symbols.get(BaseConfig.EPSILON_SYMBOL)
 
+        data = {}
+        # Нетерминалы, если они записаны в файле раньше продукций
+        non_terms = None
         try:
+            with file:
+                for key, value in JsonStreamReader(file).iter_items(stream_keys=('productions',)):
+                    if key != 'productions':
+                        data[key] = value
+                        continue
+
+                    if isinstance(data.get('non_terms'), list):
+                        non_terms = set(map(intern, data['non_terms']))
+
+                    productions = ProductionIndex()
+                    for left, right in value:
+                        if isinstance(left, list):
+                            raise BaseException('Grammar must be context free')
+
+                        left = intern(left)
+                        if non_terms is not None and left not in non_terms:
+                            raise BaseException('Grammar is incorrect')
+
+                        productions.add(left, tuple(eps if x == BaseConfig.EPSILON_SIGN else intern(x) for x in right))
+                    data[key] = productions
+
             self.terms = data['terms']
             self.non_terms = data['non_terms']
             self.start_symbol = data['start_symbol']
-            self.productions = data['productions']
-        except:
+            self._productions = data['productions']
+        except (ValueError, TypeError, KeyError):
             raise BaseException('Unable to parse JSON file')
-        finally:
-            file.close()
 
-        for i, production in enumerate(self.productions):
-            for j, symbol in enumerate(production[1]):
-                if symbol == BaseConfig.EPSILON_SIGN:
-                    production[1][j] = BaseConfig.EPSILON_SYMBOL
-
-        self._check_grammar()
+        self._symbols = symbols
+        self._eps = eps
+        self._check_grammar(check_productions=non_terms is None)
+
+    def _write_productions(self, file, format_production, chunk_size, separator=''):
+        """Запись продукций блоками по chunk_size: строки блока собираются
+        в одну и передаются в file.write, поэтому дополнительная память
+        не зависит от числа продукций"""
+        productions = iter(self._productions.view())
+        first = True
+        while True:
+            chunk = separator.join(map(format_production, itertools.islice(productions, chunk_size)))
+            if not chunk:
+                break
+            file.write(chunk if first else separator + chunk)
+            first = False
+
+    def save_to_json(self, filename, chunk_size=4096):
+        """Сохранение грамматики в JSON-файл в формате load_from_json
+        (ε записывается как EPSILON_SIGN). Продукции записываются по одной
+        на строку блоками по chunk_size"""
+        # JSON-представления имен символов по их номерам
+        names = [json.dumps(x, ensure_ascii=False) for x in self._symbols.names(range(len(self._symbols)))]
+        names[self._eps] = json.dumps(BaseConfig.EPSILON_SIGN)
+
+        def format_production(production):
+            return '\t[' + names[production[0]] + ', [' + ', '.join([names[x] for x in production[1]]) + ']]'
+
+        with open(filename, 'w', buffering=1 << 16) as file:
+            file.write('{\n\t"terms": ' + json.dumps(self.terms, ensure_ascii=False) +
+                       ',\n\t"non_terms": ' + json.dumps(self.non_terms, ensure_ascii=False) +
+                       ',\n\t"start_symbol": ' + json.dumps(self.start_symbol, ensure_ascii=False) +
+                       ',\n\t"productions": [\n')
+            self._write_productions(file, format_production, chunk_size, ',\n')
+            file.write('\n\t]\n}\n')
+
+    def save_to_text(self, filename, chunk_size=4096):
+        """Сохранение грамматики в текстовый файл: терминалы, нетерминалы,
+        стартовый символ, затем по одной продукции на строку в виде
+        A -> X1 X2 ... Xn (символы разделены пробелами)"""
+        name, names = self._symbols.name, self._symbols.names
+
+        def format_production(production):
+            return name(production[0]) + ' -> ' + ' '.join(names(production[1])) + '\n'
+
+        with open(filename, 'w', buffering=1 << 16) as file:
+            file.write('Terms: ' + ' '.join(self.terms) + '\n' +
+                       'Non-terms: ' + ' '.join(self.non_terms) + '\n' +
+                       'Start symbol: ' + str(self.start_symbol) + '\n' +
+                       'Productions (' + str(len(self._productions)) + '):\n')
+            self._write_productions(file, format_production, chunk_size)
+
+    def save_binary(self, filename):
+        """Сохранение грамматики в двоичном формате (см. binary_format)"""
+        intern = self._symbols.intern
+        terms = [intern(x) for x in self.terms]
+        non_terms = [intern(x) for x in self.non_terms]
+        start_symbol = None if self.start_symbol is None else intern(self.start_symbol)
+
+        with open(filename, 'wb') as file:
+            binary_format.dump(file, self._symbols.names(range(len(self._symbols))),
+                               terms, non_terms, start_symbol, self._productions)
+
+    def load_binary(self, filename):
+        """Загрузка грамматики, сохраненной методом save_binary. Файл
+        отображается в память, поэтому загрузка не требует разбора текста.
+        Продукции остаются в массивах номеров символов до первого изменения
+        или выборки по левой части (см. ProductionIndex.packed)"""
+        try:
+            names, terms, non_terms, start_symbol, productions = binary_format.load(filename)
+        except OSError:
+            raise FileNotFoundError('Unable to open binary file')
+        except ValueError:
+            raise BaseException('Unable to parse binary file')
+
+        self._symbols = SymbolTable(names)
+        self._eps = self._symbols.intern(BaseConfig.EPSILON_SYMBOL)
+        self.terms = self._symbols.names(terms)
+        self.non_terms = self._symbols.names(non_terms)
+        self.start_symbol = None if start_symbol is None else self._symbols.name(start_symbol)
+        self._productions = ProductionIndex.packed(*productions, len(names))
+        self._check_grammar(check_productions=False)
 
     def print_info(self, header=None):
         if header:
@@ -366,7 +1225,59 @@ class Grammar:
         print('Terms:', ' '.join(self.terms))
         print('Non-terms:', ' '.join(self.non_terms))
         print('Start symbol:', str(self.start_symbol))
-        print('Productions (' + str(len(self.productions)) + '): ', end='')
-        for production in self.productions:
-            print(str(production[0]) + '-->' + ''.join(production[1]) + '  ', end='')
+        print('Productions (' + str(len(self._productions)) + '): ', end='')
+        name, names = self._symbols.name, self._symbols.names
+        self._write_productions(sys.stdout, lambda x: name(x[0]) + '-->' + ''.join(names(x[1])) + '  ', 4096)
         print('\n')
+
+
+def _hatch_root(name):
+    """Имя без завершающих символов HATCH_SYMBOL: общий корень A, A', A'', ..."""
+    hatch = BaseConfig.HATCH_SYMBOL
+    while name.endswith(hatch) and len(name) > len(hatch):
+        name = name[:-len(hatch)]
+    return name
+
+
+def _process_symbol_group(task):
+    """Обработка группы нетерминалов в процессе пула (см.
+    Grammar._process_symbols_parallel). task - (операция, нетерминалы группы,
+    их продукции, занятые имена), операция - '_left_factoring_symbol' или
+    'remove_left_recursion_direct_symbol', занятые имена - имена грамматики
+    с тем же корнем, что и у группы. Возвращает для каждого нетерминала пару
+    (продукции, добавленные его обработкой, новые нетерминалы) или None,
+    если продукции не изменились"""
+    operation, symbols, productions, taken = task
+    # При запуске процесса через fork приемник instrumentation наследуется
+    instrumentation.disable()
+
+    grammar = Grammar()
+    grammar.non_terms = list(dict.fromkeys(symbols))
+    grammar._reserved_names = set(taken)
+    for symbol in symbols:
+        grammar._symbols.intern(symbol)
+    grammar.productions = productions
+    ranks = grammar._symbols.ranks()
+    name, names = grammar._symbols.name, grammar._symbols.names
+
+    results = []
+    for symbol in symbols:
+        index = grammar._productions
+        version, size = index.version, len(index)
+        removed = len(index.get_left(grammar._symbols.intern(symbol)))
+        non_terms_size = len(grammar.non_terms)
+        if operation == '_left_factoring_symbol':
+            new_symbols = grammar._left_factoring_symbol(symbol, ranks)
+        else:
+            getattr(grammar, operation)(symbol)
+            new_symbols = grammar.non_terms[non_terms_size:]
+
+        if index.version == version:
+            results.append(None)
+            continue
+        # Обработка удаляет продукции нетерминала и добавляет новые в конец
+        added = len(index) - size + removed
+        results.append(([[name(left), names(right)]
+                         for left, right in itertools.islice(index.view(), len(index) - added, None)],
+                        new_symbols))
+    return results
@@ -0,0 +1,49 @@
+def strongly_connected_components(graph):
+    """Поиск компонент сильной связности ориентированного графа алгоритмом
+    Тарьяна за O(V+E). Обход выполняется без рекурсии, поэтому подходит для
+    графов с большим числом вершин.
+    graph - словарь: вершина -> смежные с ней вершины.
+    Компоненты возвращаются в обратном топологическом порядке"""
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in graph:
+        if root in index:
+            continue
+
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get(root, ())))]
+
+        while work:
+            node, neighbours = work[-1]
+            for next_node in neighbours:
+                if next_node not in index:
+                    index[next_node] = low[next_node] = len(index)
+                    stack.append(next_node)
+                    on_stack.add(next_node)
+                    work.append((next_node, iter(graph.get(next_node, ()))))
+                    break
+                if next_node in on_stack:
+                    low[node] = min(low[node], index[next_node])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        symbol = stack.pop()
+                        on_stack.discard(symbol)
+                        component.append(symbol)
+                        if symbol == node:
+                            break
+                    components.append(component)
+
+    return components
@@ -0,0 +1,215 @@
+from graph import strongly_connected_components
+
+
+class IncrementalState:
+    """Данные о грамматике, которые обновляются при каждой правке
+    (Grammar.add_production, remove_production, add_symbol) за время,
+    пропорциональное правке, а не размеру грамматики: данные для проверки
+    корректности, множество нетерминалов, выводящих ε, граф цепных
+    продукций и множество нетерминалов с непосредственной левой рекурсией.
+
+    Состояние относится к конкретной версии грамматики (см. stamp и matches):
+    после любого другого изменения продукций или списков символов, в том
+    числе изменения элементов списков на месте, оно строится заново при
+    следующей правке"""
+
+    def __init__(self, grammar):
+        self._eps = grammar._eps
+        intern = grammar._symbols.intern
+        self.terms = set(map(intern, grammar.terms))
+        self.non_terms = set(map(intern, grammar.non_terms))
+        # Число символов, входящих и в терминалы, и в нетерминалы
+        self.overlap = len(self.terms & self.non_terms)
+        # Число различных продукций, левая часть которых не нетерминал
+        self.invalid_lefts = 0
+        # Число различных продукций, содержащих ε в правой части
+        self.eps_productions = 0
+
+        # Продукция -> число ее копий в грамматике
+        self._copies = {}
+        # A -> {продукция с левой частью A: None}
+        self._by_left = {}
+        # Символ -> {продукция: число вхождений символа в правую часть}
+        self._occurrences = {}
+        # Продукция -> число символов правой части, еще не выводящих ε
+        self._counters = {}
+        self.nullable = set()
+
+        # A -> {B: None} для цепных продукций A->B
+        self.unit_graph = {}
+        # Есть ли циклы из цепных продукций, None - неизвестно (при построении
+        # вычисляется при первом запросе, а не проверкой каждого ребра)
+        self._has_cycles = None
+        # A -> число различных продукций вида A->Aα
+        self._left_recursion = {}
+        # Нетерминалы, для которых есть продукция вида A->Aα
+        self.left_recursive = set()
+
+        for left, right in grammar._productions.view():
+            self.add_production(left, right)
+        self.stamp(grammar)
+
+    def stamp(self, grammar):
+        """Запоминание версии грамматики, которой соответствует состояние"""
+        self._version = grammar._productions.version
+        # Версии списков (SymbolList.version) меняются при любом их изменении
+        self._lists = (grammar.terms, grammar.terms.version, grammar.non_terms, grammar.non_terms.version)
+        self._start_symbol = grammar.start_symbol
+
+    def matches(self, grammar):
+        terms, terms_version, non_terms, non_terms_version = self._lists
+        return (self._version == grammar._productions.version and grammar.terms is terms and
+                terms.version == terms_version and grammar.non_terms is non_terms and
+                non_terms.version == non_terms_version and self._start_symbol == grammar.start_symbol)
+
+    def check_grammar(self, grammar, symbols, check_productions=True):
+        """То же, что Grammar._check_grammar, за O(1)"""
+        if not grammar.start_symbol or len(grammar.terms) < 1 or \
+                len(grammar.non_terms) < 1 or len(grammar._productions) < 1:
+            raise BaseException('Grammar is empty')
+
+        if symbols.get(grammar.start_symbol) not in self.non_terms:
+            raise BaseException('Grammar is incorrect')
+
+        if self.overlap > 0:
+            raise BaseException('Grammar is incorrect')
+
+        if check_productions and self.invalid_lefts > 0:
+            raise BaseException('Grammar is incorrect')
+
+    def has_cycles(self):
+        """Проверка, есть ли циклы из цепных продукций. После удаления
+        цепной продукции из графа с циклами ответ вычисляется заново, но
+        только по графу цепных продукций"""
+        if self._has_cycles is None:
+            self._has_cycles = any(len(component) > 1 or component[0] in self.unit_graph.get(component[0], ())
+                                   for component in strongly_connected_components(self.unit_graph))
+        return self._has_cycles
+
+    def _add_unit_edge(self, left, right):
+        self.unit_graph.setdefault(left, {})[right] = None
+        if self._has_cycles is not False:
+            return
+
+        # Новое ребро A->B замыкает цикл, только если A достижим из B
+        visited = {right}
+        stack = [right]
+        while stack:
+            symbol = stack.pop()
+            if symbol == left:
+                self._has_cycles = True
+                return
+            for next_symbol in self.unit_graph.get(symbol, ()):
+                if next_symbol not in visited:
+                    visited.add(next_symbol)
+                    stack.append(next_symbol)
+
+    def add_symbol(self, symbol, is_term):
+        if is_term:
+            self.terms.add(symbol)
+            return
+
+        self.non_terms.add(symbol)
+        self.invalid_lefts -= len(self._by_left.get(symbol, ()))
+        if self._left_recursion.get(symbol):
+            self.left_recursive.add(symbol)
+        # Продукции вида A->B становятся цепными
+        for production in self._occurrences.get(symbol, ()):
+            if len(production[1]) == 1:
+                self._add_unit_edge(production[0], symbol)
+
+    def add_production(self, left, right):
+        production = (left, right)
+        copies = self._copies.get(production, 0)
+        self._copies[production] = copies + 1
+        if copies > 0:
+            return
+
+        self._by_left.setdefault(left, {})[production] = None
+        if left not in self.non_terms:
+            self.invalid_lefts += 1
+        if self._eps in right:
+            self.eps_productions += 1
+        if len(right) == 1 and right[0] in self.non_terms:
+            self._add_unit_edge(left, right[0])
+        if right and right[0] == left:
+            self._left_recursion[left] = self._left_recursion.get(left, 0) + 1
+            if left in self.non_terms:
+                self.left_recursive.add(left)
+
+        right = () if right == (self._eps,) else right
+        for symbol in right:
+            occurrences = self._occurrences.setdefault(symbol, {})
+            occurrences[production] = occurrences.get(production, 0) + 1
+        self._counters[production] = sum(1 for symbol in right if symbol not in self.nullable)
+        if self._counters[production] == 0:
+            self._add_nullable([left])
+
+    def remove_production(self, left, right):
+        production = (left, right)
+        copies = self._copies[production] - 1
+        if copies > 0:
+            self._copies[production] = copies
+            return
+        del self._copies[production]
+
+        by_left = self._by_left[left]
+        del by_left[production]
+        if not by_left:
+            del self._by_left[left]
+        if left not in self.non_terms:
+            self.invalid_lefts -= 1
+        if self._eps in right:
+            self.eps_productions -= 1
+        if len(right) == 1 and right[0] in self.non_terms:
+            del self.unit_graph[left][right[0]]
+            if self._has_cycles:
+                self._has_cycles = None
+        if right and right[0] == left:
+            self._left_recursion[left] -= 1
+            if self._left_recursion[left] == 0:
+                del self._left_recursion[left]
+                self.left_recursive.discard(left)
+
+        for symbol in set(() if right == (self._eps,) else right):
+            occurrences = self._occurrences[symbol]
+            del occurrences[production]
+            if not occurrences:
+                del self._occurrences[symbol]
+        if self._counters.pop(production) == 0 and left in self.nullable:
+            self._remove_nullable(left)
+
+    def _add_nullable(self, symbols):
+        """Добавление symbols в множество выводящих ε и распространение по
+        продукциям, в правые части которых они входят"""
+        worklist = [x for x in symbols if x not in self.nullable]
+        self.nullable.update(worklist)
+        while worklist:
+            symbol = worklist.pop()
+            for production, count in self._occurrences.get(symbol, {}).items():
+                self._counters[production] -= count
+                if self._counters[production] == 0 and production[0] not in self.nullable:
+                    self.nullable.add(production[0])
+                    worklist.append(production[0])
+
+    def _remove_nullable(self, symbol):
+        """Пересчет после удаления продукции, из-за которой symbol выводил ε:
+        из множества удаляются все нетерминалы, вывод ε из которых мог
+        использовать symbol, затем из них снова добавляются те, для которых
+        есть другой вывод ε"""
+        suspects = {symbol}
+        worklist = [symbol]
+        while worklist:
+            for production in self._occurrences.get(worklist.pop(), ()):
+                left = production[0]
+                if self._counters[production] == 0 and left in self.nullable and left not in suspects:
+                    suspects.add(left)
+                    worklist.append(left)
+
+        self.nullable -= suspects
+        for suspect in suspects:
+            for production, count in self._occurrences.get(suspect, {}).items():
+                self._counters[production] += count
+
+        self._add_nullable([x for x in suspects
+                            if any(self._counters[production] == 0 for production in self._by_left.get(x, ()))])
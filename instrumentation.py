@@ -0,0 +1,166 @@
+import functools
+import json
+import time
+import tracemalloc
+
+# Приемник записей или None, если сбор отключен. При отключенном сборе
+# обертка метода сводится к одной проверке
+_sink = None
+_trace_memory = False
+# Записи выполняющихся сейчас методов (вложенные вызовы - в конце)
+_active = []
+
+
+class MemorySink:
+    """Приемник, сохраняющий записи в списке records"""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Приемник, записывающий каждую запись строкой JSON в файл"""
+
+    def __init__(self, filename):
+        self._file = open(filename, 'w')
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def enable(sink, trace_memory=False):
+    """Включение сбора. trace_memory - измерять пиковый объем памяти
+    (tracemalloc, заметно замедляет работу) для вызовов верхнего уровня"""
+    global _sink, _trace_memory
+    _sink = sink
+    _trace_memory = trace_memory
+
+
+def disable():
+    """Отключение сбора. Возвращает приемник, который был включен"""
+    global _sink
+    sink, _sink = _sink, None
+    return sink
+
+
+def is_enabled():
+    return _sink is not None
+
+
+def count(name, value=1):
+    """Увеличение счетчика name у выполняющегося метода"""
+    if _active:
+        counters = _active[-1]['counters']
+        counters[name] = counters.get(name, 0) + value
+
+
+def instrumented(method):
+    """Декоратор метода Grammar: при включенном сборе записывает время
+    выполнения, число продукций до и после, счетчики (см. count) и, для
+    вызовов верхнего уровня, число добавленных и удаленных продукций и
+    пиковый объем памяти"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _sink is None:
+            return method(self, *args, **kwargs)
+
+        sink = _sink
+        top_level = len(_active) == 0
+        # Путь вызова: имена внешних методов и самого метода через '/'
+        path = _active[-1]['path'] + '/' + method.__name__ if _active else method.__name__
+        record = {'operation': method.__name__, 'path': path, 'depth': len(_active), 'seconds': None,
+                  'productions_before': len(self._productions), 'productions_after': None, 'counters': {}}
+        before = set(self._productions) if top_level else None
+
+        trace_memory = top_level and _trace_memory
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if trace_memory:
+            tracemalloc.reset_peak()
+
+        _active.append(record)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        except BaseException as e:
+            record['error'] = type(e).__name__ + ': ' + str(e)
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            _active.pop()
+            if trace_memory:
+                record['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+
+            record['productions_after'] = len(self._productions)
+            if top_level:
+                after = set(self._productions)
+                record['productions_added'] = len(after - before)
+                record['productions_removed'] = len(before - after)
+            sink.write(record)
+
+    return wrapper
+
+
+def summarize(records):
+    """Сводка по путям вызовов: число вызовов, суммарное время, сумма
+    счетчиков. Вложенные вызовы перечисляются после внешнего вызова, имя
+    операции в поле operation дополнено отступом по глубине вложенности"""
+    summary = {}
+    for record in records:
+        item = summary.get(record['path'])
+        if item is None:
+            top_level = record['depth'] == 0
+            name = '  ' * record['depth'] + record['operation']
+            item = summary[record['path']] = {'operation': name, 'calls': 0, 'seconds': 0.0,
+                                    'productions_added': 0 if top_level else None,
+                                    'productions_removed': 0 if top_level else None,
+                                    'peak_bytes': None, 'counters': {}}
+        item['calls'] += 1
+        item['seconds'] += record['seconds']
+        if record['depth'] == 0:
+            item['productions_added'] += record['productions_added']
+            item['productions_removed'] += record['productions_removed']
+        if record.get('peak_bytes') is not None:
+            item['peak_bytes'] = max(item['peak_bytes'] or 0, record['peak_bytes'])
+        for counter, value in record['counters'].items():
+            item['counters'][counter] = item['counters'].get(counter, 0) + value
+
+    # Записи пишутся по завершении вызова, то есть вложенные раньше внешних,
+    # поэтому пути упорядочиваются как дерево: внешний вызов перед вложенными
+    index = {path: i for i, path in enumerate(summary)}
+
+    def key(path):
+        parts = path.split('/')
+        return [index.get('/'.join(parts[:i + 1]), -1) for i in range(len(parts))]
+
+    order = sorted(summary, key=key)
+    return [summary[path] for path in order]
+
+
+def format_report(records):
+    """Текст отчета по записям (см. summarize)"""
+    def optional(value):
+        return '' if value is None else value
+
+    lines = ['{:40} {:>7} {:>10} {:>9} {:>9} {:>12}  {}'.format(
+        'operation', 'calls', 'seconds', 'added', 'removed', 'peak bytes', 'counters')]
+    for item in summarize(records):
+        counters = ', '.join(name + '=' + str(value) for name, value in sorted(item['counters'].items()))
+        lines.append('{:40} {:7} {:10.4f} {:>9} {:>9} {:>12}  {}'.format(
+            item['operation'], item['calls'], item['seconds'], optional(item['productions_added']),
+            optional(item['productions_removed']), optional(item['peak_bytes']), counters))
+    return '\n'.join(lines)
@@ -0,0 +1,109 @@
+import json
+
+
+class JsonStreamReader:
+    """Потоковое чтение JSON-объекта верхнего уровня из файла.
+
+    Значения полей разбираются по мере чтения файла блоками, а массивы
+    из stream_keys возвращаются в виде итераторов по элементам, поэтому
+    файл не загружается в память целиком"""
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _read_chunk(self, size=None):
+        chunk = self._file.read(size or self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        # Отбрасывание уже разобранной части буфера
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Следующий значащий символ (пробельные символы пропускаются)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_chunk():
+                raise ValueError('Unexpected end of JSON')
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError('Expected ' + char)
+        self._pos += 1
+
+    def _read_value(self):
+        self._peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Значение, упирающееся в конец буфера, может быть прочитано
+                # не полностью (например, число)
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise ValueError('Invalid JSON value')
+
+            # Значение не уместилось в буфер: дочитывание блоками возрастающего размера
+            self._read_chunk(size)
+            size *= 2
+
+    def _iter_array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self._read_value()
+            char = self._peek()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError('Expected , or ]')
+
+    def iter_items(self, stream_keys=()):
+        """Перебор пар (ключ, значение) объекта верхнего уровня. Значения
+        полей из stream_keys - итераторы по элементам массива, их нужно
+        дочитать до перехода к следующей паре"""
+        self._expect('{')
+        if self._peek() == '}':
+            return
+
+        while True:
+            key = self._read_value()
+            if not isinstance(key, str):
+                raise ValueError('Expected key')
+            self._expect(':')
+
+            if key in stream_keys:
+                items = self._iter_array()
+                yield key, items
+                # Дочитывание элементов, если они не были использованы
+                for _ in items:
+                    pass
+            else:
+                yield key, self._read_value()
+
+            char = self._peek()
+            self._pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError('Expected , or }')
@@ -0,0 +1,391 @@
+import random
+
+from graph import strongly_connected_components
+
+
+class SentenceCounter:
+    """Число выводов цепочек каждой длины до max_length и выбор случайной
+    цепочки заданной длины.
+
+    Для каждой пары (нетерминал, длина) запоминается число выводов, для
+    каждой продукции - число способов вывести каждый префикс правой части
+    заданной длины (динамическое программирование по разбиениям правой
+    части). Выводы ε считаются одним выводом. Если нетерминал A выводит
+    цепочку длины n через B с той же длиной (A->αBβ, α и β выводят ε) и такие
+    зависимости образуют цикл, бесконечное число выводов заменяется суммой
+    по компоненте сильной связности: нетерминалы компоненты получают одно и
+    то же число, положительное тогда и только тогда, когда цепочки этой
+    длины есть. Для однозначных грамматик без таких циклов число выводов
+    равно числу цепочек"""
+
+    def __init__(self, grammar, max_length):
+        symbols = grammar._symbols
+        self.max_length = max_length
+        self._name = symbols.name
+        self._non_terms = set(map(symbols.intern, grammar.non_terms))
+        self._start = symbols.intern(grammar.start_symbol)
+        nullable = grammar._get_derived('nullable', grammar._get_nullable_symbols)
+
+        self._productions = []
+        self._by_left = {}
+        for left, right in grammar._productions.view():
+            self._non_terms.add(left)
+            self._by_left.setdefault(left, []).append(len(self._productions))
+            self._productions.append((left, () if right == (grammar._eps,) else right))
+
+        size = max_length + 1
+        # Нетерминал -> число выводов по длинам
+        self._counts = {x: [1 if x in nullable else 0] + [0] * max_length for x in self._non_terms}
+        # Нетерминал -> число выводов по длинам без выводов через нетерминал
+        # с той же длиной (сумма _base_prefixes по продукциям)
+        self._base_counts = {x: [0] * size for x in self._non_terms}
+        # Продукция -> prefixes[i][m] - число выводов цепочек длины m из первых i
+        # символов правой части
+        self._prefixes = []
+        # То же для длины m = n без выводов, в которых один нетерминал
+        # выводит всю цепочку длины n
+        self._base_prefixes = []
+        for _, right in self._productions:
+            prefixes = [[1] + [0] * max_length]
+            for symbol in right:
+                prefixes.append([prefixes[-1][0] * self._count(symbol, 0)] + [0] * max_length)
+            self._prefixes.append(prefixes)
+            self._base_prefixes.append([[0] * size for _ in range(len(right) + 1)])
+
+        # A -> {B: число пар (продукция, позиция)} для продукций A->αBβ, где
+        # α и β выводят ε: A выводит цепочку длины n через B с той же длиной
+        self._edges = {x: {} for x in self._non_terms}
+        for left, right in self._productions:
+            for i, symbol in enumerate(right):
+                if symbol in self._non_terms and all(x in nullable for j, x in enumerate(right) if j != i):
+                    self._edges[left][symbol] = self._edges[left].get(symbol, 0) + 1
+
+        # Компоненты в обратном топологическом порядке: B раньше A для A->B
+        self._components = strongly_connected_components(self._edges)
+        self._component = {}
+        for component in self._components:
+            cyclic = len(component) > 1 or component[0] in self._edges[component[0]]
+            for symbol in component:
+                self._component[symbol] = component if cyclic else None
+
+        for length in range(1, size):
+            self._count_length(length)
+
+    def _count(self, symbol, length):
+        if symbol in self._non_terms:
+            return self._counts[symbol][length]
+        return 1 if length == 1 else 0
+
+    def _count_length(self, n):
+        counts, non_terms = self._counts, self._non_terms
+
+        for production, (left, right) in enumerate(self._productions):
+            prefixes = self._prefixes[production]
+            base_prefixes = self._base_prefixes[production]
+            for i, symbol in enumerate(right, 1):
+                previous = prefixes[i - 1]
+                total = base_prefixes[i - 1][n] * self._count(symbol, 0)
+                for length in range(1, n):
+                    if previous[n - length]:
+                        total += previous[n - length] * self._count(symbol, length)
+                if symbol not in non_terms:
+                    total += previous[0] * self._count(symbol, n)
+                base_prefixes[i][n] = total
+            self._base_counts[left][n] += base_prefixes[len(right)][n]
+
+        for component in self._components:
+            if self._component[component[0]] is None:
+                symbol = component[0]
+                counts[symbol][n] = self._base_counts[symbol][n] + sum(
+                    multiplicity * counts[x][n] for x, multiplicity in self._edges[symbol].items())
+                continue
+
+            members = set(component)
+            total = 0
+            for symbol in component:
+                total += self._base_counts[symbol][n]
+                total += sum(multiplicity * counts[x][n]
+                             for x, multiplicity in self._edges[symbol].items() if x not in members)
+            for symbol in component:
+                counts[symbol][n] = total
+
+        for production, (_, right) in enumerate(self._productions):
+            prefixes = self._prefixes[production]
+            for i, symbol in enumerate(right, 1):
+                previous = prefixes[i - 1]
+                prefixes[i][n] = sum(previous[n - length] * self._count(symbol, length)
+                                     for length in range(n + 1) if previous[n - length])
+
+    def count(self, length, symbol=None):
+        """Число выводов цепочек длины length из symbol (по умолчанию -
+        из стартового символа)"""
+        symbol = self._start if symbol is None else symbol
+        return self._counts[symbol][length] if length <= self.max_length else None
+
+    def counts(self):
+        """Число выводов из стартового символа для длин 0..max_length"""
+        return list(self._counts[self._start])
+
+    def _options(self, symbol, n):
+        """Варианты вывода цепочки длины n > 0 из symbol и их веса:
+        ('base', нетерминал) или ('edge', нетерминал)"""
+        component = self._component[symbol] or [symbol]
+        members = set(component)
+        options = []
+        for member in component:
+            options.append((self._base_counts[member][n], ('base', member)))
+            for x, multiplicity in self._edges[member].items():
+                if x not in members:
+                    options.append((multiplicity * self._counts[x][n], ('edge', x)))
+        return options
+
+    def _split_options(self, production, i, m, n):
+        """Длины, выводимые i-м символом правой части, при длине префикса из
+        i символов m и длине всей цепочки n, и их веса"""
+        symbol = self._productions[production][1][i - 1]
+        prefixes = self._prefixes[production][i - 1]
+        options = []
+        for length in range(m + 1):
+            if length == 0 and m == n:
+                weight = self._base_prefixes[production][i - 1][n] * self._count(symbol, 0)
+            elif length == n and symbol in self._non_terms:
+                weight = 0
+            else:
+                weight = prefixes[m - length] * self._count(symbol, length)
+            options.append((weight, length))
+        return options
+
+    @staticmethod
+    def _choose(options, rng):
+        point = rng.randrange(sum(weight for weight, _ in options))
+        for weight, option in options:
+            if point < weight:
+                return option
+            point -= weight
+
+    def sample(self, length, rng=random):
+        """Случайная цепочка длины length (список имен терминалов); каждый
+        вывод выбирается с равной вероятностью. None, если таких цепочек нет"""
+        if not self.count(length):
+            return None
+
+        sentence = []
+        stack = [(self._start, length)]
+        while stack:
+            symbol, n = stack.pop()
+            if symbol not in self._non_terms:
+                sentence.append(self._name(symbol))
+                continue
+            if n == 0:
+                continue
+
+            kind, member = self._choose(self._options(symbol, n), rng)
+            if kind == 'edge':
+                stack.append((member, n))
+                continue
+
+            production = self._choose([(self._base_prefixes[x][len(self._productions[x][1])][n], x)
+                                       for x in self._by_left.get(member, ())], rng)
+            right = self._productions[production][1]
+            m = n
+            for i in range(len(right), 0, -1):
+                symbol_length = self._choose(self._split_options(production, i, m, n), rng)
+                stack.append((right[i - 1], symbol_length))
+                m -= symbol_length
+        return sentence
+
+    def sentences(self, length):
+        """Множество всех цепочек длины length (кортежи имен терминалов).
+        Время пропорционально числу выводов"""
+        memo = {}
+
+        def derive(symbol, n):
+            if symbol not in self._non_terms:
+                return {(self._name(symbol),)} if n == 1 else set()
+            if n == 0:
+                return {()} if self._counts[symbol][0] else set()
+
+            key = (symbol, n)
+            if key not in memo:
+                memo[key] = result = set()
+                for kind, member in (option for weight, option in self._options(symbol, n) if weight):
+                    if kind == 'edge':
+                        result |= derive(member, n)
+                        continue
+                    for production in self._by_left.get(member, ()):
+                        right = self._productions[production][1]
+                        if self._base_prefixes[production][len(right)][n]:
+                            result |= split(production, len(right), n, n)
+            return memo[key]
+
+        def split(production, i, m, n):
+            if i == 0:
+                return {()}
+            symbol = self._productions[production][1][i - 1]
+            result = set()
+            for weight, symbol_length in self._split_options(production, i, m, n):
+                if weight:
+                    suffixes = derive(symbol, symbol_length)
+                    result |= {x + y for x in split(production, i - 1, m - symbol_length, n) for y in suffixes}
+            return result
+
+        if not self.count(length):
+            return set()
+        return derive(self._start, length)
+
+
+class Recognizer:
+    """Распознаватель Эрли для произвольной контекстно-свободной грамматики
+    (с ε-продукциями, левой рекурсией и циклами; ε-продукции обрабатываются
+    по Эйкоку и Хорспулу).
+
+    Предсказанные ситуации столбца зависят только от множества ожидаемых
+    нетерминалов, поэтому их замыкание строится один раз для каждого такого
+    множества. Столбцы таблицы запоминаются в префиксном дереве цепочек, и
+    цепочки с общим префиксом разбираются без повторной работы"""
+
+    def __init__(self, grammar):
+        symbols = grammar._symbols
+        self._get = symbols.get
+        self._non_terms = set(map(symbols.intern, grammar.non_terms))
+        self._nullable = grammar._get_derived('nullable', grammar._get_nullable_symbols)
+        self._start = symbols.intern(grammar.start_symbol)
+        self._lefts = []
+        self._rights = []
+        self._by_left = {}
+        for left, right in grammar._productions.view():
+            self._non_terms.add(left)
+            self._by_left.setdefault(left, []).append(len(self._rights))
+            self._lefts.append(left)
+            self._rights.append(() if right == (grammar._eps,) else right)
+
+        # Множество нетерминалов -> ожидающие предсказанные ситуации по символу
+        self._closures = {}
+        # Узел дерева: [столбец, дочерние узлы по терминалам]. Столбец -
+        # (ожидающие ситуации (продукция, позиция, начало) по символу,
+        # ожидающие предсказанные ситуации (продукция, позиция) с началом в
+        # этом столбце, допускается ли префикс)
+        self._root = [({}, self._closure({self._start}), self._start in self._nullable), {}]
+
+    def _closure(self, roots):
+        key = frozenset(roots)
+        closure = self._closures.get(key)
+        if closure is not None:
+            return closure
+
+        closure = {}
+        predicted = set(roots)
+        worklist = [(x, 0) for root in roots for x in self._by_left.get(root, ())]
+        items = set(worklist)
+        while worklist:
+            production, dot = worklist.pop()
+            right = self._rights[production]
+            if dot == len(right):
+                continue
+            symbol = right[dot]
+            closure.setdefault(symbol, []).append((production, dot))
+            if symbol not in self._non_terms:
+                continue
+
+            new_items = []
+            if symbol not in predicted:
+                predicted.add(symbol)
+                new_items.extend((x, 0) for x in self._by_left.get(symbol, ()))
+            if symbol in self._nullable:
+                new_items.append((production, dot + 1))
+            for item in new_items:
+                if item not in items:
+                    items.add(item)
+                    worklist.append(item)
+
+        self._closures[key] = closure
+        return closure
+
+    def _build_column(self, chart, seeds):
+        """Столбец по ситуациям seeds, перенесенным из предыдущего столбца
+        чтением терминала. chart - предыдущие столбцы. Завершение ситуаций с
+        началом в этом столбце (вывод ε) учтено при предсказании"""
+        items = set(seeds)
+        worklist = list(items)
+        waiting = {}
+        roots = set()
+        accepted = False
+        while worklist:
+            item = worklist.pop()
+            production, dot, origin = item
+            right = self._rights[production]
+            new_items = []
+            if dot < len(right):
+                symbol = right[dot]
+                waiting.setdefault(symbol, []).append(item)
+                if symbol in self._non_terms:
+                    roots.add(symbol)
+                    if symbol in self._nullable:
+                        new_items.append((production, dot + 1, origin))
+            else:
+                left = self._lefts[production]
+                if left == self._start and origin == 0:
+                    accepted = True
+                origin_waiting, origin_closure, _ = chart[origin]
+                new_items.extend((x, d + 1, o) for x, d, o in origin_waiting.get(left, ()))
+                new_items.extend((x, d + 1, origin) for x, d in origin_closure.get(left, ()))
+
+            for new_item in new_items:
+                if new_item not in items:
+                    items.add(new_item)
+                    worklist.append(new_item)
+
+        return waiting, self._closure(roots), accepted
+
+    def recognize(self, tokens):
+        node = self._root
+        chart = []
+        for token in tokens:
+            column = node[0]
+            if not column[0] and not column[1]:
+                return False
+            k = len(chart)
+            chart.append(column)
+            symbol = self._get(token)
+            if symbol in self._non_terms:
+                symbol = None
+            child = node[1].get(symbol)
+            if child is None:
+                seeds = [(x, d + 1, o) for x, d, o in column[0].get(symbol, ())]
+                seeds.extend((x, d + 1, k) for x, d in column[1].get(symbol, ()))
+                child = node[1][symbol] = [self._build_column(chart, seeds), {}]
+            node = child
+        return node[0][2]
+
+
+def compare_languages(before, after, max_length, samples=200, exhaustive_limit=2000, seed=0):
+    """Сравнение языков двух грамматик на цепочках длины до max_length.
+    Для каждой длины и каждой грамматики: если выводов не больше
+    exhaustive_limit, перебираются все цепочки, иначе выбирается samples
+    случайных; каждая цепочка проверяется распознавателем другой грамматики.
+    Возвращает список различий {'sentence', 'before', 'after'},
+    упорядоченный по длине и цепочке; пустой список - языки совпадают на
+    проверенных цепочках (при полном переборе - на всех цепочках)"""
+    grammars = [before, after]
+    counters = [SentenceCounter(x, max_length) for x in grammars]
+    recognizers = [Recognizer(x) for x in grammars]
+    rng = random.Random(seed)
+
+    differences = {}
+    for length in range(max_length + 1):
+        for side in (0, 1):
+            counter = counters[side]
+            count = counter.count(length)
+            if count == 0:
+                continue
+            if count <= exhaustive_limit:
+                sentences = sorted(counter.sentences(length))
+            else:
+                sentences = [tuple(counter.sample(length, rng)) for _ in range(samples)]
+
+            other = recognizers[1 - side]
+            for sentence in sentences:
+                if sentence not in differences and not other.recognize(sentence):
+                    differences[sentence] = {'sentence': list(sentence), 'before': side == 0, 'after': side == 1}
+
+    return [differences[x] for x in sorted(differences, key=lambda x: (len(x), x))]
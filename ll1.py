@@ -0,0 +1,189 @@
+import itertools
+from array import array
+
+from config import BaseConfig
+
+# Перевод символов '0' и '1' в байты 0 и 1
+_BINARY_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+class _Columns(dict):
+    """Номера столбцов терминалов; неизвестному терминалу соответствует -1"""
+
+    def __missing__(self, key):
+        return -1
+
+
+def _bit_positions(bits):
+    return itertools.compress(itertools.count(), bin(bits)[:1:-1].encode('ascii').translate(_BINARY_DIGITS))
+
+
+class LL1Table:
+    """Управляющая таблица предиктивного анализатора LL(1).
+
+    Столбцы - терминалы (последний столбец может соответствовать
+    END_SYMBOL), строки - нетерминалы. Таблица хранится в плоском массиве
+    array('i'): table[строка * width + столбец] - номер продукции или -1.
+    Если в ячейку попадает несколько продукций, в таблице остается первая,
+    а конфликт записывается в conflicts"""
+
+    def __init__(self, grammar):
+        grammar._check_grammar()
+        symbols = grammar._symbols
+
+        bits, terminal_order = grammar._get_derived('terminal_bits', grammar._compute_terminal_bits)
+        nullable = grammar._get_derived('nullable', grammar._get_nullable_symbols)
+        first = grammar._get_derived('first', grammar._compute_first_bitsets)
+        follow = grammar._get_derived('follow', grammar._compute_follow_bitsets)
+
+        self.terminals = symbols.names(terminal_order)
+        self.non_terms = list(grammar.non_terms)
+        self.start_symbol = grammar.start_symbol
+        self.width = len(self.terminals)
+        self.end = self.terminals.index(BaseConfig.END_SYMBOL)
+
+        # Кодирование символов для анализатора: терминал - номер столбца,
+        # нетерминал - width + номер строки
+        codes = {symbol: i for i, symbol in enumerate(terminal_order)}
+        for i, symbol in enumerate(self.non_terms):
+            codes[symbols.intern(symbol)] = self.width + i
+
+        self.productions = []
+        # Правые части в кодах символов, в обратном порядке (для помещения в стек)
+        self.reversed_rights = []
+        self.table = array('i', [-1]) * (len(self.non_terms) * self.width)
+        self.conflicts = []
+        conflicts = {}
+
+        for left, right in grammar._productions:
+            number = len(self.productions)
+            right = [x for x in right if x != grammar._eps]
+            self.productions.append((symbols.name(left), symbols.names(right)))
+            self.reversed_rights.append([codes[x] for x in reversed(right)])
+
+            # FIRST правой части, а если из нее выводится ε - еще и FOLLOW(left)
+            right_first = 0
+            for symbol in right:
+                if symbol not in first:
+                    right_first |= bits[symbol]
+                    break
+                right_first |= first[symbol]
+                if symbol not in nullable:
+                    break
+            else:
+                right_first |= follow[left]
+
+            row = (codes[left] - self.width) * self.width
+            for column in _bit_positions(right_first):
+                cell = row + column
+                if self.table[cell] < 0:
+                    self.table[cell] = number
+                elif self.table[cell] != number:
+                    conflicts.setdefault(cell, [self.table[cell]]).append(number)
+
+        for cell, numbers in sorted(conflicts.items()):
+            self.conflicts.append({
+                'non_term': self.non_terms[cell // self.width],
+                'terminal': self.terminals[cell % self.width],
+                'productions': [left + '->' + ''.join(right or [BaseConfig.EPSILON_SYMBOL])
+                                for left, right in map(self.productions.__getitem__, numbers)],
+            })
+
+    @property
+    def is_ll1(self):
+        return len(self.conflicts) == 0
+
+    def get(self, non_term, terminal):
+        """Продукция (левая часть, правая часть) для пары (нетерминал, терминал) или None"""
+        try:
+            number = self.table[self.non_terms.index(non_term) * self.width + self.terminals.index(terminal)]
+        except ValueError:
+            return None
+        return self.productions[number] if number >= 0 else None
+
+
+class LL1Parser:
+    """Табличный предиктивный анализатор. Входные цепочки - итерируемые
+    последовательности имен терминалов (без END_SYMBOL в конце)"""
+
+    def __init__(self, table):
+        self._width = table.width
+        self._end = table.end
+        self._start = table.width + table.non_terms.index(table.start_symbol)
+        # Список быстрее массива при чтении отдельных элементов
+        self._table = table.table.tolist()
+        self._rights = table.reversed_rights
+        self._columns = _Columns((symbol, i) for i, symbol in enumerate(table.terminals) if i != table.end)
+
+    def encode(self, tokens):
+        """Перевод имен терминалов в номера столбцов (неизвестный терминал - -1)"""
+        return array('i', map(self._columns.__getitem__, tokens))
+
+    def _parse_codes(self, codes):
+        """Разбор итерируемой последовательности номеров столбцов"""
+        width = self._width
+        end = self._end
+        table = self._table
+        rights = self._rights
+        stack = [end, self._start]
+        pop = stack.pop
+        extend = stack.extend
+
+        codes = iter(codes)
+        token = next(codes, end)
+        while True:
+            top = pop()
+            if top < width:
+                if top != token:
+                    return False
+                if top == end:
+                    return True
+                token = next(codes, end)
+            else:
+                if token < 0:
+                    return False
+                number = table[(top - width) * width + token]
+                if number < 0:
+                    return False
+                extend(rights[number])
+
+    def parse(self, tokens):
+        """Разбор цепочки. tokens - любая итерируемая последовательность, в
+        том числе итератор: терминалы берутся по одному по мере разбора,
+        поэтому цепочку можно читать из файла (см. iter_file_tokens) без
+        загрузки в память"""
+        return self._parse_codes(map(self._columns.__getitem__, tokens))
+
+    def parse_encoded(self, codes):
+        """Разбор цепочки, заранее переведенной методом encode"""
+        return self._parse_codes(codes)
+
+    def parse_batch(self, sequences):
+        """Разбор множества цепочек. Возвращает список результатов"""
+        columns = self._columns.__getitem__
+        parse_codes = self._parse_codes
+        return [parse_codes(map(columns, tokens)) for tokens in sequences]
+
+    def parse_lines(self, lines):
+        """Построчный разбор: каждая строка - цепочка терминалов, разделенных
+        пробельными символами. Возвращает итератор результатов"""
+        for line in lines:
+            yield self.parse(line.split())
+
+
+def iter_file_tokens(file, chunk_size=65536):
+    """Итератор по терминалам файла, разделенным пробельными символами.
+    Файл читается блоками по chunk_size символов независимо от границ
+    строк; терминал, разрезанный границей блока, склеивается со следующим
+    блоком"""
+    rest = ''
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        tokens = (rest + chunk).split()
+        # Последний терминал может продолжаться в следующем блоке
+        rest = tokens.pop() if tokens and not chunk[-1].isspace() else ''
+        yield from tokens
+    if rest:
+        yield rest
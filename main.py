@@ -1,5 +1,29 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import TransformationCache
 from config import BaseConfig
+import instrumentation
 from grammar import Grammar
+from pipeline import GrammarPipeline
+
+
+# Операции, доступные в пакетном режиме
+OPERATIONS = {
+    'remove_useless_symbols': lambda grammar: grammar.remove_useless_symbols(),
+    'remove_eps_productions': lambda grammar: grammar.remove_eps_productions(),
+    'remove_cycles': lambda grammar: grammar.remove_cycles(),
+    'remove_left_recursion_direct': lambda grammar: grammar.remove_left_recursion_direct(),
+    'remove_left_recursion_indirect': lambda grammar: grammar.remove_left_recursion_indirect(),
+    'remove_left_recursion_moore': lambda grammar: grammar.remove_left_recursion_moore(),
+    'left_factoring': lambda grammar: grammar.left_factoring(),
+    'to_cnf': lambda grammar: grammar.to_cnf(),
+}
 
 
 def remove_left_recursion_direct(non_term, filename):
@@ -42,8 +66,197 @@ def remove_eps_productions(filename):
     grammar.print_info(header='o')
 
 
+def _expand_inputs(inputs):
+    """Список файлов грамматик по заданным файлам, каталогам и шаблонам"""
+    filenames = []
+    for item in inputs:
+        if os.path.isdir(item):
+            filenames.extend(sorted(glob.glob(os.path.join(item, '**', '*.json'), recursive=True)))
+        elif glob.has_magic(item):
+            filenames.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            filenames.append(item)
+
+    # Повторы убираются с сохранением порядка
+    return list(dict.fromkeys(filenames))
+
+
+def _output_filenames(filenames, output_dir):
+    """Имена выходных файлов, уникальные в пределах output_dir"""
+    used = set()
+    output_filenames = []
+    for filename in filenames:
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        name, i = stem, 1
+        while name in used:
+            i += 1
+            name = stem + '_' + str(i)
+        used.add(name)
+        output_filenames.append(os.path.join(output_dir, name + '.json'))
+    return output_filenames
+
+
+# Кэш процесса-обработчика: (каталог, размер) -> TransformationCache
+_caches = {}
+
+
+def _get_cache(directory, max_size):
+    cache = _caches.get((directory, max_size))
+    if cache is None:
+        cache = _caches[(directory, max_size)] = TransformationCache(directory, max_size)
+    return cache
+
+
+def _process_file(task):
+    """Обработка одного файла (выполняется в отдельном процессе).
+    Ошибки возвращаются в результате и не прерывают обработку остальных файлов"""
+    filename, output_filename, operations, cache_dir, cache_size, profile = task
+    result = {'file': filename, 'output': output_filename, 'ok': False, 'error': None, 'cached': False,
+              'productions_in': None, 'productions_out': None, 'seconds': None, 'steps': None, 'profile': None}
+    if profile:
+        instrumentation.enable(instrumentation.MemorySink(), trace_memory=True)
+    start = time.perf_counter()
+    try:
+        grammar = Grammar()
+        if filename.endswith('.bin'):
+            grammar.load_binary(filename)
+        else:
+            grammar.load_from_json(filename)
+        result['productions_in'] = len(grammar._productions)
+
+        # Вся последовательность операций кэшируется как одно преобразование
+        cache = _get_cache(cache_dir, cache_size) if cache_dir else None
+        key = cache.key(grammar, 'batch', operations) if cache else None
+        if cache and cache.load(key, grammar):
+            result['cached'] = True
+        else:
+            pipeline = GrammarPipeline()
+            for operation in operations:
+                pipeline.add(OPERATIONS[operation], name=operation)
+            result['steps'] = [{'step': x['step'], 'seconds': x['seconds'], 'changed': x['changed']}
+                               for x in pipeline.run(grammar)]
+            if cache:
+                cache.store(key, grammar)
+
+        if output_filename:
+            grammar.save_to_json(output_filename)
+        result['productions_out'] = len(grammar._productions)
+        result['ok'] = True
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except BaseException as e:
+        # Грамматика сообщает об ошибках исключениями BaseException
+        result['error'] = type(e).__name__ + ': ' + str(e)
+    finally:
+        if profile:
+            result['profile'] = instrumentation.disable().records
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(inputs, operations, output_dir=None, jobs=None, chunk_size=8, report=None,
+              cache_dir=None, cache_size=256 * 1024 * 1024, profile=False):
+    """Применение последовательности операций к множеству файлов грамматик
+    в пуле процессов. Результаты по каждому файлу выводятся по мере готовности
+    (и пишутся в report в формате JSON lines). Если задан cache_dir, результаты
+    берутся из кэша на диске. Если задан profile, в сводку добавляются записи
+    instrumentation по всем файлам. Возвращает сводку"""
+    for operation in operations:
+        if operation not in OPERATIONS:
+            raise ValueError('Unknown operation ' + operation)
+
+    filenames = _expand_inputs(inputs)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        output_filenames = _output_filenames(filenames, output_dir)
+    else:
+        output_filenames = [None] * len(filenames)
+    tasks = [(filename, output_filename, list(operations), cache_dir, cache_size, profile)
+             for filename, output_filename in zip(filenames, output_filenames)]
+
+    summary = {'files': len(tasks), 'ok': 0, 'failed': 0, 'cached': 0, 'productions': 0, 'seconds': 0.0,
+               'profile': [] if profile else None}
+    start = time.perf_counter()
+    report_file = open(report, 'w') if report else None
+    try:
+        if jobs == 1:
+            results = map(_process_file, tasks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=jobs)
+            results = executor.map(_process_file, tasks, chunksize=chunk_size)
+
+        try:
+            for result in results:
+                if result['ok']:
+                    summary['ok'] += 1
+                    summary['cached'] += result['cached']
+                    summary['productions'] += result['productions_out']
+                    print('OK     ' + result['file'] + ' (' + str(result['productions_in']) + ' -> ' +
+                          str(result['productions_out']) + ' productions, ' +
+                          '{:.3f}'.format(result['seconds']) + ' s' + (', cached' if result['cached'] else '') + ')')
+                else:
+                    summary['failed'] += 1
+                    print('FAILED ' + result['file'] + ': ' + result['error'])
+
+                if profile:
+                    summary['profile'].extend(result['profile'])
+                if report_file:
+                    report_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    report_file.flush()
+        finally:
+            if executor:
+                executor.shutdown()
+    finally:
+        if report_file:
+            report_file.close()
+
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 0:
+        remove_left_recursion_direct('S', 'grammar1.json')
+        remove_left_recursion_indirect('grammar1.json')
+        left_factoring('grammar2.json')
+        remove_eps_productions('grammar3.json')
+        return 0
+
+    parser = argparse.ArgumentParser(description='Transform grammar files in batch. '
+                                                 'Without arguments runs the demo transformations.')
+    parser.add_argument('inputs', nargs='+', help='grammar files (.json or .bin), directories or glob patterns')
+    parser.add_argument('-o', '--operations', required=True,
+                        help='comma-separated operations: ' + ', '.join(OPERATIONS))
+    parser.add_argument('-d', '--output-dir', help='directory for transformed grammars')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=8, help='files sent to a worker at once')
+    parser.add_argument('--report', help='write per-file results to this JSON lines file')
+    parser.add_argument('--cache-dir', help='reuse transformation results stored in this directory')
+    parser.add_argument('--cache-size', type=int, default=256, help='cache size limit in MB')
+    parser.add_argument('--profile', action='store_true',
+                        help='record timings, counters and peak memory of grammar methods and print a report')
+    args = parser.parse_args(argv)
+
+    operations = [x.strip() for x in args.operations.split(',') if x.strip()]
+    unknown = [x for x in operations if x not in OPERATIONS]
+    if unknown:
+        parser.error('unknown operations: ' + ', '.join(unknown))
+
+    summary = run_batch(args.inputs, operations, args.output_dir, args.jobs, args.chunk_size, args.report,
+                        args.cache_dir, args.cache_size * 1024 * 1024, args.profile)
+    seconds = max(summary['seconds'], 1e-9)
+    print('-' * 80)
+    print('Files: ' + str(summary['files']) + ', ok: ' + str(summary['ok']) + ', failed: ' + str(summary['failed']) +
+          ', cached: ' + str(summary['cached']))
+    print('Time: {:.3f} s, {:.1f} files/s, {:.0f} productions/s'.format(
+        summary['seconds'], summary['files'] / seconds, summary['productions'] / seconds))
+    if args.profile:
+        print('-' * 80)
+        print(instrumentation.format_report(summary['profile']))
+    return 1 if summary['failed'] else 0
+
+
 if __name__ == '__main__':
-    remove_left_recursion_direct('S', 'grammar1.json')
-    remove_left_recursion_indirect('grammar1.json')
-    left_factoring('grammar2.json')
-    remove_eps_productions('grammar3.json')
+    sys.exit(main())
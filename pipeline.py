@@ -0,0 +1,82 @@
+import time
+
+
+class GrammarPipeline:
+    """Последовательность преобразований грамматики.
+
+    Грамматика проверяется один раз перед первым шагом: преобразования
+    сохраняют ее корректность, поэтому повторные проверки в каждом методе
+    отключаются (Grammar._validated). Таблица символов, индекс продукций и
+    запомненные производные данные (множество нетерминалов, выводящих ε,
+    циклы и т.д.) переходят от шага к шагу вместе с объектом грамматики.
+
+    Шаги можно повторять в нескольких раундах: шаг пропускается, если
+    грамматика не менялась с момента его предыдущего выполнения, а работа
+    завершается, если за раунд ни один шаг не изменил грамматику. Изменения
+    определяются по версиям хранилища продукций и списков символов, без
+    копирования и сравнения продукций: преобразования, которым нечего
+    делать, хранилище не изменяют"""
+
+    def __init__(self, steps=()):
+        # Шаги: (имя, операция, args, kwargs)
+        self._steps = []
+        for step in steps:
+            self.add(step)
+
+    def __len__(self):
+        return len(self._steps)
+
+    def add(self, operation, *args, name=None, **kwargs):
+        """Добавление шага. operation - имя метода Grammar или функция,
+        принимающая грамматику; args и kwargs передаются в операцию.
+        Возвращает сам конвейер"""
+        if name is None:
+            name = operation if isinstance(operation, str) else operation.__name__
+        self._steps.append((name, operation, args, kwargs))
+        return self
+
+    @staticmethod
+    def _state(grammar):
+        return grammar._productions.version, grammar.terms.version, grammar.non_terms.version, grammar.start_symbol
+
+    def run(self, grammar, rounds=1):
+        """Выполнение шагов над grammar (грамматика изменяется на месте).
+        Возвращает список результатов шагов: номер раунда, имя шага, время
+        в секундах, изменена ли грамматика, число продукций после шага"""
+        grammar._check_grammar()
+
+        results = []
+        # Шаг -> состояние грамматики после его последнего выполнения без изменений
+        unchanged_states = {}
+        validated = grammar._validated
+        grammar._validated = True
+        try:
+            for round_number in range(rounds):
+                round_changed = False
+                for i, (name, operation, args, kwargs) in enumerate(self._steps):
+                    state = self._state(grammar)
+                    if unchanged_states.get(i) == state:
+                        continue
+
+                    start = time.perf_counter()
+                    if isinstance(operation, str):
+                        getattr(grammar, operation)(*args, **kwargs)
+                    else:
+                        operation(grammar, *args, **kwargs)
+                    seconds = time.perf_counter() - start
+
+                    changed = self._state(grammar) != state
+                    if changed:
+                        round_changed = True
+                    else:
+                        unchanged_states[i] = state
+
+                    results.append({'round': round_number, 'step': name, 'seconds': seconds, 'changed': changed,
+                                    'productions': len(grammar._productions)})
+
+                if not round_changed:
+                    break
+        finally:
+            grammar._validated = validated
+
+        return results
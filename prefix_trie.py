@@ -0,0 +1,131 @@
+class _Node:
+    __slots__ = ('children', 'count', 'ends')
+
+    def __init__(self):
+        # Символ -> дочерний узел
+        self.children = {}
+        # Количество правых частей, проходящих через узел
+        self.count = 0
+        # Правые части, заканчивающиеся в узле
+        self.ends = []
+
+
+class PrefixTrie:
+    """Префиксное дерево правых частей продукций, построенное по символам
+    грамматики (а не по символам строк), поэтому многосимвольные символы
+    вроде id не совпадают с префиксом i"""
+
+    def __init__(self, right_parts=()):
+        self._root = _Node()
+        # Верхняя оценка количества повторяющихся правых частей
+        self._duplicates = 0
+        # Счетчики для instrumentation: созданные узлы и узлы, пройденные max_prefix
+        self.nodes = 1
+        self.visited = 0
+        for right_part in right_parts:
+            self.add(right_part)
+
+    def __len__(self):
+        return self._root.count
+
+    def add(self, right_part):
+        right_part = tuple(right_part)
+        node = self._root
+        node.count += 1
+        for symbol in right_part:
+            child = node.children.get(symbol)
+            if child is None:
+                child = node.children[symbol] = _Node()
+                self.nodes += 1
+            child.count += 1
+            node = child
+        if len(node.ends) > 0:
+            self._duplicates += 1
+        node.ends.append(right_part)
+
+    def max_prefix(self, key=None):
+        """Поиск наибольшего (в лексикографическом порядке) непустого префикса,
+        общего для двух или более правых частей. Такие префиксы образуют
+        замкнутое относительно взятия префикса множество, поэтому достаточно
+        спускаться по дереву, выбирая наибольший символ среди узлов,
+        через которые проходят хотя бы две правые части.
+        key - функция, задающая порядок символов (как в max)"""
+        prefix = []
+        node = self._root
+        while True:
+            symbols = [symbol for symbol, child in node.children.items() if child.count > 1]
+            if len(symbols) == 0:
+                break
+            symbol = max(symbols, key=key)
+            prefix.append(symbol)
+            node = node.children[symbol]
+        self.visited += len(prefix) + 1
+
+        if len(prefix) == 0:
+            return None
+
+        return tuple(prefix)
+
+    def pop_prefix(self, prefix):
+        """Удаление всех правых частей, начинающихся с prefix, и возврат их
+        в виде списка"""
+        path = [self._root]
+        for symbol in prefix:
+            node = path[-1].children.get(symbol)
+            if node is None:
+                return []
+            path.append(node)
+
+        node = path[-1]
+        removed = node.count
+        for parent in path:
+            parent.count -= removed
+        if len(prefix) == 0:
+            self._root = _Node()
+
+        # Отсечение ветви, через которую больше не проходит ни одна правая часть
+        for i in range(1, len(path)):
+            if path[i].count == 0:
+                del path[i - 1].children[prefix[i - 1]]
+                break
+
+        right_parts = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            right_parts.extend(current.ends)
+            stack.extend(current.children.values())
+        return right_parts
+
+    def deduplicate(self):
+        """Удаление повторяющихся правых частей"""
+        if self._duplicates == 0:
+            return
+        self._duplicates = 0
+
+        # Обход в прямом порядке, затем пересчет количества в обратном,
+        # чтобы каждый узел учел дубликаты из своего поддерева
+        order = []
+        stack = [(self._root, None)]
+        while stack:
+            node, parent = stack.pop()
+            order.append((node, parent))
+            for child in node.children.values():
+                stack.append((child, node))
+
+        removed = {}
+        for node, parent in reversed(order):
+            duplicates = removed.pop(id(node), 0) + max(len(node.ends) - 1, 0)
+            del node.ends[1:]
+            node.count -= duplicates
+            if parent is not None and duplicates > 0:
+                removed[id(parent)] = removed.get(id(parent), 0) + duplicates
+
+    def right_parts(self):
+        right_parts = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            right_parts.extend(node.ends)
+            stack.extend(node.children.values())
+        return right_parts
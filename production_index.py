@@ -0,0 +1,241 @@
+import itertools
+
+# Общий для всех хранилищ счетчик версий: версия меняется при каждом изменении
+# продукций и не повторяется у разных хранилищ
+_versions = itertools.count(1)
+
+
+class ProductionIndex:
+    """Хранилище продукций грамматики с сохранением порядка добавления.
+
+    Продукции хранятся в виде кортежей (A, (X1, ..., Xn)) и индексируются
+    по левой части A и по паре (A, X1). Индексы обновляются при каждом
+    изменении, поэтому выборка и удаление продукций по A или по (A, X1)
+    не требуют просмотра всего списка продукций.
+
+    Атрибут version меняется при каждом изменении (и только при нем) и
+    позволяет кэшировать вычисленные по продукциям данные и узнавать,
+    изменило ли преобразование грамматику.
+
+    Хранилище, созданное методом packed, держит продукции в массивах номеров
+    символов и строит кортежи и индексы только при первой выборке или
+    изменении; до этого len и обход продукций выполняются по массивам"""
+
+    def __init__(self, productions=()):
+        self.version = next(_versions)
+        # Массивы продукций (см. packed) или None, если индексы построены
+        self._packed = None
+        self._next_id = 0
+        # Идентификатор продукции -> продукция, в порядке добавления
+        self._productions = {}
+        # A -> {идентификатор продукции: None}
+        self._by_left = {}
+        # A -> X1 -> {идентификатор продукции: None}
+        self._by_left_first = {}
+        # Символ -> число его вхождений в продукции (в левые и правые части),
+        # None - не ведется до первого запроса (см. symbol_counts)
+        self._symbol_counts = None
+        self.extend(productions)
+
+    @classmethod
+    def packed(cls, lefts, right_offsets, rights, n_symbols):
+        """Хранилище продукций, заданных массивами номеров символов (см.
+        binary_format): lefts[i] - левая часть i-й продукции, ее правая часть -
+        rights[right_offsets[i]:right_offsets[i + 1]], номера символов меньше
+        n_symbols"""
+        index = cls()
+        index._packed = (lefts, right_offsets, rights, n_symbols)
+        return index
+
+    @staticmethod
+    def _packed_productions(packed):
+        lefts, right_offsets, rights, n_symbols = packed
+        # Одинаковые номера символов разделяют один объект int
+        symbol_ids = list(range(n_symbols)).__getitem__
+        for i, left in enumerate(lefts):
+            yield symbol_ids(left), tuple(map(symbol_ids, rights[right_offsets[i]:right_offsets[i + 1]]))
+
+    def _unpack(self):
+        """Построение кортежей продукций и индексов по массивам. Продукции
+        не изменяются, поэтому версия остается прежней"""
+        if self._packed is None:
+            return
+        version = self.version
+        productions = self._packed_productions(self._packed)
+        self._packed = None
+        self.extend(productions)
+        self.version = version
+
+    def __len__(self):
+        if self._packed is not None:
+            return len(self._packed[0])
+        return len(self._productions)
+
+    def __iter__(self):
+        if self._packed is not None:
+            return self._packed_productions(self._packed)
+        return iter(list(self._productions.values()))
+
+    def view(self):
+        """Продукции в порядке добавления без копирования списка. Хранилище
+        нельзя изменять, пока обход не завершен"""
+        if self._packed is not None:
+            return self._packed_productions(self._packed)
+        return self._productions.values()
+
+    def add(self, left, right):
+        self._unpack()
+        right = tuple(right)
+        first = right[0] if right else None
+        production_id = self._next_id
+        self._next_id += 1
+        self.version = next(_versions)
+
+        self._productions[production_id] = (left, right)
+        self._by_left.setdefault(left, {})[production_id] = None
+        self._by_left_first.setdefault(left, {}).setdefault(first, {})[production_id] = None
+        if self._symbol_counts is not None:
+            self._count_symbols([(left, right)], 1)
+
+    def extend(self, productions):
+        # То же, что add в цикле, но без вызова метода на каждую продукцию
+        self._unpack()
+        all_productions = self._productions
+        by_left = self._by_left
+        by_left_first = self._by_left_first
+        counts = self._symbol_counts
+        production_id = self._next_id
+        for left, right in productions:
+            right = tuple(right)
+            first = right[0] if right else None
+            if counts is not None:
+                counts[left] = counts.get(left, 0) + 1
+                for symbol in right:
+                    counts[symbol] = counts.get(symbol, 0) + 1
+
+            all_productions[production_id] = (left, right)
+            left_ids = by_left.get(left)
+            if left_ids is None:
+                left_ids = by_left[left] = {}
+                firsts = by_left_first[left] = {}
+            else:
+                firsts = by_left_first[left]
+            left_ids[production_id] = None
+            first_ids = firsts.get(first)
+            if first_ids is None:
+                first_ids = firsts[first] = {}
+            first_ids[production_id] = None
+            production_id += 1
+        if production_id != self._next_id:
+            self._next_id = production_id
+            self.version = next(_versions)
+
+    def remove(self, left, right):
+        """Удаление продукции (A, (X1, ..., Xn)); из нескольких одинаковых
+        удаляется добавленная первой. Просматриваются только продукции вида
+        A->X1γ. Возвращает False, если такой продукции нет"""
+        self._unpack()
+        right = tuple(right)
+        first = right[0] if right else None
+        firsts = self._by_left_first.get(left)
+        first_ids = firsts.get(first) if firsts else None
+        if not first_ids:
+            return False
+
+        for production_id in first_ids:
+            if self._productions[production_id][1] == right:
+                break
+        else:
+            return False
+
+        del first_ids[production_id]
+        if not first_ids:
+            del firsts[first]
+            if not firsts:
+                del self._by_left_first[left]
+        by_left = self._by_left[left]
+        del by_left[production_id]
+        if not by_left:
+            del self._by_left[left]
+        production = self._productions.pop(production_id)
+        if self._symbol_counts is not None:
+            self._count_symbols([production], -1)
+        self.version = next(_versions)
+        return True
+
+    def get_left(self, left):
+        """Продукции вида A->γ по заданному A"""
+        self._unpack()
+        production_ids = self._by_left.get(left, ())
+        return [self._productions[x] for x in production_ids]
+
+    def get_left_firsts(self, left):
+        """Первые символы правых частей продукций вида A->Bγ по заданному A
+        (None - для пустой правой части)"""
+        self._unpack()
+        return list(self._by_left_first.get(left, ()))
+
+    def has_left_first(self, left, first):
+        """Проверка, есть ли хотя бы одна продукция вида A->Bγ по
+        заданным A и B"""
+        self._unpack()
+        return first in self._by_left_first.get(left, ())
+
+    def pop_left(self, left):
+        """Удаление продукций вида A->γ по заданному A и возврат их
+        в виде списка"""
+        self._unpack()
+        production_ids = self._by_left.pop(left, None)
+        if not production_ids:
+            return []
+
+        del self._by_left_first[left]
+        self.version = next(_versions)
+        productions = [self._productions.pop(x) for x in production_ids]
+        if self._symbol_counts is not None:
+            self._count_symbols(productions, -1)
+        return productions
+
+    def pop_left_first(self, left, first):
+        """Удаление продукций вида A->Bγ по заданным A и B и возврат их
+        в виде списка"""
+        self._unpack()
+        firsts = self._by_left_first.get(left)
+        if not firsts or first not in firsts:
+            return []
+
+        production_ids = firsts.pop(first)
+        self.version = next(_versions)
+        if not firsts:
+            del self._by_left_first[left]
+
+        by_left = self._by_left[left]
+        for production_id in production_ids:
+            del by_left[production_id]
+        if not by_left:
+            del self._by_left[left]
+
+        productions = [self._productions.pop(x) for x in production_ids]
+        if self._symbol_counts is not None:
+            self._count_symbols(productions, -1)
+        return productions
+
+    def symbol_counts(self):
+        """Символ -> число его вхождений в продукции (только символы,
+        которые входят хотя бы в одну продукцию). После первого запроса
+        счетчики обновляются при каждом изменении. Словарь нельзя изменять"""
+        if self._symbol_counts is None:
+            self._unpack()
+            self._symbol_counts = {}
+            self._count_symbols(self._productions.values(), 1)
+        return self._symbol_counts
+
+    def _count_symbols(self, productions, delta):
+        counts = self._symbol_counts
+        for left, right in productions:
+            for symbol in (left,) + right:
+                count = counts.get(symbol, 0) + delta
+                if count:
+                    counts[symbol] = count
+                else:
+                    del counts[symbol]
@@ -0,0 +1,75 @@
+class _WriteThroughList(list):
+    """Список, после каждого изменения которого вызывается _changed"""
+
+    __slots__ = ()
+
+    def _changed(self):
+        raise NotImplementedError
+
+
+def _write_through(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend', 'insert', 'pop',
+              'remove', 'clear', 'sort', 'reverse'):
+    setattr(_WriteThroughList, _name, _write_through(_name))
+
+
+class _ProductionPart(_WriteThroughList):
+    """Продукция [A, [X1, ..., Xn]] или ее правая часть в ProductionList"""
+
+    __slots__ = ('_root',)
+
+    def __init__(self, items, root):
+        list.__init__(self, items)
+        self._root = root
+
+    def _changed(self):
+        self._root._changed()
+
+
+class ProductionList(_WriteThroughList):
+    """Продукции грамматики в виде списка [[A, [X1, ..., Xn]], ...] (см.
+    Grammar.productions). Изменение списка, продукций в нем или их правых
+    частей записывается в грамматику: продукции грамматики заменяются
+    содержимым списка. Если продукции грамматики после получения списка
+    изменились другим способом, изменение списка вызывает ошибку"""
+
+    __slots__ = ('_grammar', '_version')
+
+    def __init__(self, grammar, productions):
+        list.__init__(self, (_ProductionPart((left, _ProductionPart(right, self)), self)
+                             for left, right in productions))
+        self._grammar = grammar
+        self._version = grammar._productions.version
+
+    def is_current(self):
+        return self._version == self._grammar._productions.version
+
+    def _wrap(self, production):
+        if isinstance(production, _ProductionPart) and production._root is self and \
+                len(production) == 2 and isinstance(production[1], _ProductionPart):
+            return production
+        production = _ProductionPart(production, self)
+        if len(production) == 2 and not (isinstance(production[1], _ProductionPart) and
+                                         production[1]._root is self):
+            list.__setitem__(production, 1, _ProductionPart(production[1], self))
+        return production
+
+    def _changed(self):
+        if not self.is_current():
+            raise BaseException('Productions were changed after the list was obtained')
+
+        self._grammar.productions = self
+        # Добавленные в список продукции тоже должны записываться в грамматику
+        list.__setitem__(self, slice(None), [self._wrap(x) for x in self])
+        self._version = self._grammar._productions.version
@@ -0,0 +1,115 @@
+import itertools
+
+# Общий для всех списков счетчик версий (см. SymbolList.version)
+_versions = itertools.count(1)
+
+
+class SymbolTable:
+    """Таблица символов грамматики: каждому терминалу и нетерминалу
+    сопоставляется небольшое целое число. Продукции хранятся в виде кортежей
+    таких чисел, поэтому сравнение и хеширование символов сводится к операциям
+    над int, а одинаковые символы не дублируются в памяти"""
+
+    __slots__ = ('_ids', '_names')
+
+    def __init__(self, names=()):
+        # Имя символа -> номер
+        self._ids = {}
+        # Номер символа -> имя
+        self._names = []
+        for name in names:
+            self.intern(name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def intern(self, name):
+        symbol_id = self._ids.get(name)
+        if symbol_id is None:
+            symbol_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return symbol_id
+
+    def get(self, name):
+        return self._ids.get(name)
+
+    def name(self, symbol_id):
+        return self._names[symbol_id]
+
+    def names(self, symbol_ids):
+        names = self._names
+        return [names[x] for x in symbol_ids]
+
+    def ranks(self):
+        """Номер символа -> место его имени в отсортированном списке имен.
+        Сравнение рангов дает тот же порядок, что и сравнение имен"""
+        ranks = [0] * len(self._names)
+        for rank, symbol_id in enumerate(sorted(range(len(self._names)), key=self._names.__getitem__)):
+            ranks[symbol_id] = rank
+        return ranks
+
+
+class SymbolList(list):
+    """Список имен символов (Grammar.terms, Grammar.non_terms) с множеством
+    имен для проверки принадлежности за O(1). Множество обновляется при
+    добавлении в конец списка и строится заново после любого другого
+    изменения. Атрибут version меняется при каждом изменении списка и не
+    повторяется у разных списков"""
+
+    __slots__ = ('version', '_names')
+
+    def __init__(self, names=()):
+        list.__init__(self, names)
+        self.version = next(_versions)
+        self._names = None
+
+    def names(self):
+        """Множество имен списка. Множество нельзя изменять"""
+        if self._names is None:
+            self._names = set(self)
+        return self._names
+
+    def append(self, name):
+        list.append(self, name)
+        if self._names is not None:
+            self._names.add(name)
+        self.version = next(_versions)
+
+    def extend(self, names):
+        names = list(names)
+        if not names:
+            return
+        list.extend(self, names)
+        if self._names is not None:
+            self._names.update(names)
+        self.version = next(_versions)
+
+    def __iadd__(self, names):
+        self.extend(names)
+        return self
+
+    def _changed(self):
+        self._names = None
+        self.version = next(_versions)
+
+
+def _invalidating(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__imul__', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(SymbolList, _name, _invalidating(_name))
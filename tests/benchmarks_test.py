@@ -0,0 +1,27 @@
+import unittest
+
+from benchmarks.generator import generate_grammar
+from benchmarks.run import compare
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generate_grammar(self):
+        grammar = generate_grammar(seed=7, non_terms=20, alternatives=4, rhs_length=5, left_recursion=0.5,
+                                   nullable=0.5)
+        self.assertEqual(grammar.productions, generate_grammar(seed=7, non_terms=20, alternatives=4, rhs_length=5,
+                                                               left_recursion=0.5, nullable=0.5).productions)
+        self.assertEqual(len(grammar.non_terms), 20)
+        self.assertTrue(grammar._check_left_recursion_direct())
+        self.assertTrue(grammar._check_eps_productions())
+        self.assertFalse(grammar._check_cycles())
+        grammar._check_grammar()
+
+    def test_compare(self):
+        baseline = [{'operation': 'op', 'size': size, 'seconds': size * 0.001, 'peak_bytes': size * 100}
+                    for size in (10, 20, 40)]
+        self.assertEqual(compare(baseline, baseline), [])
+
+        # Квадратичный рост вместо линейного
+        results = [{'operation': 'op', 'size': size, 'seconds': size * size * 0.001, 'peak_bytes': size * 100}
+                   for size in (10, 20, 40)]
+        self.assertEqual([x['metric'] for x in compare(results, baseline)], ['time exponent'])
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from cache import TransformationCache
+from config import TestConfig
+from grammar import Grammar
+
+
+class TestTransformationCache(unittest.TestCase):
+    def _load(self, cache, filename='remove_left_recursion_test.json'):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + filename)
+        grammar.cache = cache
+        return grammar
+
+    def test_hit_and_miss(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TransformationCache(directory)
+
+            expected = self._load(None)
+            expected.remove_left_recursion_indirect()
+
+            grammar = self._load(cache)
+            grammar.remove_left_recursion_indirect()
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            grammar = self._load(cache)
+            grammar.remove_left_recursion_indirect()
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(grammar.non_terms, expected.non_terms)
+            self.assertEqual(grammar.productions, expected.productions)
+
+            # Другие аргументы - другой ключ
+            grammar = self._load(cache)
+            grammar.remove_left_recursion_indirect(check_cycles=False)
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TransformationCache(directory, max_size=1)
+            self._load(cache, 'remove_eps_test1.json').remove_eps_productions()
+            self._load(cache, 'remove_eps_test2.json').remove_eps_productions()
+            self.assertEqual(cache.stats()['entries'], 0)
+            self.assertEqual(cache.evictions, 2)
+
+            cache.max_size = 10 ** 6
+            grammar = self._load(cache, 'left_factoring_test.json')
+            grammar.left_factoring()
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+    # Позиционные, именованные аргументы и значения по умолчанию дают один
+    # ключ, параметры выполнения (jobs, chunk_size) в ключ не входят
+    def test_key_arguments(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TransformationCache(directory)
+            self._load(cache).remove_left_recursion_indirect()
+            self._load(cache).remove_left_recursion_indirect(True)
+            self._load(cache).remove_left_recursion_indirect(check_cycles=True, check_eps=True)
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+            self._load(cache, 'left_factoring_test.json').left_factoring()
+            self._load(cache, 'left_factoring_test.json').left_factoring(jobs=2, chunk_size=1)
+            self.assertEqual((cache.hits, cache.misses), (3, 2))
+            self.assertEqual(cache.stats()['entries'], 2)
+
+    # Каталог просматривается только при первом сохранении и при превышении
+    # ограничения размера
+    def test_eviction_scans(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TransformationCache(directory)
+            with mock.patch.object(cache, '_entries', wraps=cache._entries) as entries:
+                for filename in ('remove_eps_test1.json', 'remove_eps_test2.json', 'remove_eps_test3.json'):
+                    self._load(cache, filename).remove_eps_productions()
+                self.assertEqual(entries.call_count, 1)
+
+                cache.max_size = 1
+                self._load(cache, 'left_factoring_test.json').left_factoring()
+                self.assertEqual(entries.call_count, 2)
+                self.assertEqual(cache.evictions, 4)
+
+    # Имена новых нетерминалов не зависят от истории грамматики, которая не
+    # входит в ключ, поэтому попадание и промах дают одинаковый результат
+    def test_history_does_not_change_result(self):
+        def load(cache, history):
+            grammar = self._load(cache)
+            if history:
+                productions = grammar.productions
+                grammar.productions = [['S', ["S'", "X'"]], ['X', ['b']]]
+                grammar.productions = productions
+            return grammar
+
+        expected = load(None, False)
+        expected.remove_left_recursion_indirect()
+        for history in (True, False):
+            with tempfile.TemporaryDirectory() as directory:
+                cache = TransformationCache(directory)
+                for grammar in (load(cache, history), load(cache, not history)):
+                    grammar.remove_left_recursion_indirect()
+                    self.assertEqual(grammar.non_terms, expected.non_terms)
+                    self.assertEqual(grammar.productions, expected.productions)
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
@@ -0,0 +1,62 @@
+import itertools
+import time
+import unittest
+
+from benchmarks.parser import expression_grammar, generate_sentences
+from config import TestConfig
+from cyk import CYKRecognizer, recognize
+from grammar import Grammar
+from ll1 import LL1Parser, LL1Table
+
+
+class TestCYK(unittest.TestCase):
+    def test_compare_with_ll1(self):
+        grammar = expression_grammar()
+        grammar.to_cnf()
+        recognizer = CYKRecognizer(grammar)
+        parser = LL1Parser(LL1Table(expression_grammar()))
+
+        tokens = ['+', '*', '(', ')', 'id']
+        sentences = [list(x) for n in range(6) for x in itertools.product(tokens, repeat=n)]
+        sentences += generate_sentences(expression_grammar(), 20, 60, seed=3)
+        expected = parser.parse_batch(sentences)
+        self.assertEqual(recognizer.recognize_batch(sentences), expected)
+        self.assertEqual(recognizer.recognize_batch(sentences, batch_size=50), expected)
+        # Ограничение памяти меньше одной таблицы - цепочки по одной
+        self.assertEqual(recognizer.recognize_batch(sentences, memory_limit=1), expected)
+
+    # Грамматика не LL(1): цепочки с равным числом a и b
+    def test_ambiguous_grammar(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_eps_test1.json')
+        sentences = [list(x) for n in range(7) for x in itertools.product('ab', repeat=n)]
+        expected = [x.count('a') == x.count('b') for x in sentences]
+        self.assertEqual(recognize(grammar, sentences), expected)
+        # Исходная грамматика не изменяется
+        self.assertEqual(grammar.non_terms, ['S'])
+
+        grammar.to_cnf()
+        recognizer = CYKRecognizer(grammar)
+        self.assertTrue(recognizer.accepts_empty)
+        self.assertTrue(recognizer.recognize(list('ab' * 100 + 'ba' * 50)))
+        self.assertFalse(recognizer.recognize(list('ab' * 100 + 'a')))
+        self.assertFalse(recognizer.recognize(['a', 'c', 'b']))
+
+    def test_not_cnf(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'first_follow_test.json')
+        with self.assertRaises(BaseException):
+            CYKRecognizer(grammar)
+
+    # Длинные цепочки: таблица занимает O(n^2) бит на нетерминал, а все
+    # разбиения подцепочек одной длины обрабатываются одной операцией
+    def test_long_sentence(self):
+        grammar = expression_grammar()
+        grammar.to_cnf()
+        recognizer = CYKRecognizer(grammar)
+        sentence = ['id'] + ['+', '(', 'id', '*', 'id', ')'] * 334
+        self.assertGreaterEqual(len(sentence), 2000)
+
+        begin = time.perf_counter()
+        self.assertEqual(recognizer.recognize_batch([sentence, sentence[:-1]]), [True, False])
+        self.assertLess(time.perf_counter() - begin, 30)
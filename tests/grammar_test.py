@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 from config import TestConfig, BaseConfig
@@ -31,6 +33,23 @@ class TestGrammar(unittest.TestCase):
                           ['S', ['B']], ['S', ['A']], ['A', ['B', 'B']], ['A', ['B']], ['B', ['C', 'C']], ['B', ['C']],
                           ['B', ['a']], ['C', ['A', 'A']], ['C', ['A']], ['C', ['b']], ["S'", ['S']], ["S'", ['ε']]])
 
+    # Подряд идущие эпсилон-продукции должны удаляться все
+    def test_remove_epsilon_productions_3(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_eps_test3.json')
+        grammar.remove_eps_productions()
+        self.assertEqual(grammar.non_terms, ["S", "A", "B", "S'"])
+        self.assertEqual(grammar.start_symbol, 'S' + BaseConfig.HATCH_SYMBOL)
+        self.assertEqual(grammar.productions,
+                         [['S', ['A', 'B']], ['S', ['B']], ['S', ['A']], ['A', ['a']], ['B', ['b']],
+                          ["S'", ['S']], ["S'", ['ε']]])
+
+    def test_remove_epsilon_productions_max_combinations(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_eps_test3.json')
+        with self.assertRaises(BaseException):
+            grammar.remove_eps_productions(max_combinations=2)
+
     # Грамматика из примера на стр. 17, CS 5641, Compiler Design, Fall '06
     def test_remove_left_recursion_direct(self):
         grammar = Grammar()
@@ -44,6 +63,45 @@ class TestGrammar(unittest.TestCase):
                           ['S', ['X', 'S', "S'"]], ['S', ['a', "S'"]], ["S'", ['X', "S'"]],
                           ["S'", ['S', 'b', "S'"]], ["S'", ['ε']]])
 
+    # Если нетерминал A' уже есть в грамматике (здесь - новый начальный
+    # символ после удаления ε-продукций), создается A'', а не второй A'
+    def test_remove_left_recursion_direct_existing_hatch(self):
+        for jobs in (1, 2):
+            grammar = Grammar()
+            grammar.terms = ['a', 'b']
+            grammar.non_terms = ['S']
+            grammar.start_symbol = 'S'
+            grammar.productions = [['S', ['S', 'b']], ['S', ['a']], ['S', ['ε']]]
+            grammar.remove_eps_productions()
+            grammar.remove_left_recursion_direct(jobs=jobs)
+            self.assertEqual(grammar.non_terms, ['S', "S'", "S''"])
+            self.assertEqual(grammar.start_symbol, "S'")
+            self.assertEqual(grammar.productions,
+                             [["S'", ['S']], ["S'", ['ε']], ['S', ['b', "S''"]], ['S', ['a', "S''"]],
+                              ["S''", ['b', "S''"]], ["S''", ['ε']]])
+
+    # Имена новых нетерминалов зависят только от текущей грамматики, а не от
+    # символов, которые были в ней раньше
+    def test_hatch_names_ignore_history(self):
+        for jobs in (1, 2):
+            grammar = Grammar()
+            grammar.load_from_json(TestConfig.grammars_dir + 'remove_left_recursion_test.json')
+            grammar.productions = [['S', ["S'", 'a']], ['X', ['b']]]
+            grammar.productions = [['S', ['S', 'a']], ['S', ['X']], ['X', ['b']]]
+            grammar.remove_left_recursion_direct(jobs=jobs)
+            self.assertEqual(grammar.non_terms, ['S', 'X', "S'"])
+
+            # Имя символа, который есть только в продукциях, не выбирается
+            grammar.non_terms = ['S', 'X']
+            grammar.productions = [['S', ['S', 'a']], ['S', ['b', "S'"]], ['X', ['b']]]
+            grammar.remove_left_recursion_direct(jobs=jobs)
+            self.assertEqual(grammar.non_terms, ['S', 'X', "S''"])
+
+            grammar.non_terms = ['S', 'X']
+            grammar.productions = [['S', ['a', "S'"]], ['S', ['a', 'b']], ['X', ['b']]]
+            grammar.left_factoring(jobs=jobs)
+            self.assertEqual(grammar.non_terms, ['S', 'X', "S''"])
+
     # Грамматика из примера на стр. 17, CS 5641, Compiler Design, Fall '06
     def test_remove_left_recursion_indirect(self):
         grammar = Grammar()
@@ -59,6 +117,73 @@ class TestGrammar(unittest.TestCase):
                           ['X', ['a', "S'", 'a', "X'"]], ["X'", ['b', "X'"]],
                           ["X'", ['S', "S'", 'a', "X'"]], ["X'", ['ε']]])
 
+    # Результат совпадает с remove_left_recursion_indirect
+    def test_remove_left_recursion_moore(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_left_recursion_test.json')
+        grammar.remove_left_recursion_moore()
+        self.assertEqual(grammar.terms, ['a', 'b'])
+        self.assertEqual(grammar.non_terms, ['S', 'X', "S'", "X'"])
+        self.assertEqual(grammar.start_symbol, 'S')
+        self.assertEqual(grammar.productions,
+                         [['S', ['X', 'S', "S'"]], ['S', ['a', "S'"]],
+                          ["S'", ['X', "S'"]], ["S'", ['S', 'b', "S'"]],
+                          ["S'", ['ε']], ['X', ['b', "X'"]],
+                          ['X', ['a', "S'", 'a', "X'"]], ["X'", ['b', "X'"]],
+                          ["X'", ['S', "S'", 'a', "X'"]], ["X'", ['ε']]])
+
+    # Проверки принадлежности учитывают изменения списков на месте
+    def test_non_terms_changed_in_place(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_left_recursion_test.json')
+        grammar.non_terms[1] = 'Z'
+        grammar.productions = [['S', ['Z', 'a']], ['Z', ['b']]]
+        with self.assertRaises(BaseException):
+            grammar.remove_left_recursion_direct_symbol('X')
+        grammar.left_factoring()
+        self.assertEqual(grammar.productions, [['S', ['Z', 'a']], ['Z', ['b']]])
+
+    # Изменения списка productions записываются в грамматику
+    def test_productions_write_through(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_left_recursion_test.json')
+        grammar.productions.append(['S', ['b']])
+        self.assertIn(['S', ['b']], grammar.productions)
+        self.assertTrue(grammar._productions.has_left_first(grammar._symbols.get('S'), grammar._symbols.get('b')))
+
+        productions = grammar.productions
+        productions[0][1][0] = 'a'
+        productions[-1][1].append('a')
+        self.assertEqual(grammar.productions[0][1][0], 'a')
+        self.assertEqual(grammar.productions[-1], ['S', ['b', 'a']])
+        # Добавленная в список продукция тоже изменяется в грамматике
+        productions.insert(0, ['X', ['a']])
+        productions[0][1].append('b')
+        self.assertEqual(grammar.productions[0], ['X', ['a', 'b']])
+        del productions[0]
+        self.assertEqual(grammar.productions, productions)
+
+        # Список, полученный до другого изменения грамматики, изменять нельзя
+        grammar.remove_left_recursion_direct_symbol('S')
+        with self.assertRaises(BaseException):
+            productions.append(['S', ['a']])
+
+    def test_remove_left_recursion_moore_budget(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_left_recursion_test.json')
+        productions = grammar.productions
+        with self.assertRaises(BaseException):
+            grammar.remove_left_recursion_moore(max_productions=9)
+
+        # При превышении ограничения грамматика не изменяется
+        self.assertEqual(grammar.productions, productions)
+        self.assertEqual(grammar.non_terms, ['S', 'X'])
+
+        grammar.remove_left_recursion_moore(max_productions=10)
+        self.assertFalse(grammar._check_left_recursion_direct())
+        # Неудачная попытка не влияет на имена новых нетерминалов
+        self.assertEqual(grammar.non_terms, ['S', 'X', "S'", "X'"])
+
     # Грамматика из примера 4.11, Dragon book
     def test_remove_factoring(self):
         grammar = Grammar()
@@ -71,3 +196,221 @@ class TestGrammar(unittest.TestCase):
                          [['E', ['b']], ['S', ['a']],
                           ['S', ['i', 'E', 't', 'S', "S'"]],
                           ["S'", ['e', 'S']], ["S'", ['ε']]])
+
+    # Многосимвольные символы не должны совпадать с префиксом по первой букве
+    def test_remove_factoring_multichar_symbols(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'left_factoring_test2.json')
+        grammar.left_factoring()
+        self.assertEqual(grammar.non_terms, ['S', 'E', "S'"])
+        self.assertEqual(grammar.productions,
+                         [['E', ['id']], ['S', ['i', 'E', "S'"]],
+                          ['S', ['id', '+', 'S']],
+                          ["S'", ['t', 'S']], ["S'", ['ε']]])
+
+    # Для каждого вынесенного префикса создается свой нетерминал, в том
+    # числе при обработке в пуле процессов и когда часть имен A', A'', ...
+    # уже занята
+    def test_remove_factoring_several_prefixes(self):
+        def make_grammar(productions, non_terms):
+            grammar = Grammar()
+            grammar.terms = ['a', 'b', 'c', 'd', 'e', 'f']
+            grammar.non_terms = non_terms
+            grammar.start_symbol = 'S'
+            grammar.productions = productions
+            return grammar
+
+        for jobs in (1, 2):
+            grammar = make_grammar([['S', ['a', 'b']], ['S', ['a', 'c']], ['S', ['d', 'e']], ['S', ['d', 'f']]], ['S'])
+            grammar.left_factoring(jobs=jobs)
+            self.assertEqual(grammar.non_terms, ['S', "S'", "S''"])
+            self.assertEqual(grammar.productions,
+                             [['S', ['a', "S''"]], ['S', ['d', "S'"]], ["S'", ['e']], ["S'", ['f']],
+                              ["S''", ['b']], ["S''", ['c']]])
+
+            grammar = make_grammar([['S', ['a', 'b']], ['S', ['a', 'c']], ['S', ['d', 'e']], ['S', ['d', 'f']],
+                                    ["S''", ['a', 'b']], ["S''", ['a', 'S']]], ['S', "S''"])
+            grammar.left_factoring(jobs=jobs)
+            self.assertEqual(grammar.non_terms, ['S', "S''", "S'", "S'''", "S''''"])
+            self.assertEqual(grammar.productions,
+                             [['S', ['a', "S'''"]], ['S', ['d', "S'"]], ["S'", ['e']], ["S'", ['f']],
+                              ["S''", ['a', "S''''"]], ["S'''", ['b']], ["S'''", ['c']],
+                              ["S''''", ['S']], ["S''''", ['b']]])
+
+    # Параллельная обработка дает ту же грамматику, что и последовательная,
+    # в том числе когда нетерминал A' уже есть в грамматике
+    def test_parallel_per_symbol_operations(self):
+        def make_grammar():
+            grammar = Grammar()
+            grammar.terms = ['a', 'b', 'c']
+            grammar.non_terms = ["A'", 'A', 'B']
+            grammar.start_symbol = 'A'
+            grammar.productions = [['A', ['A', 'a']], ['A', ['a', 'b']], ['A', ['a', 'c']], ['A', ['b']],
+                                   ["A'", ["A'", 'c']], ["A'", ['a', 'B']], ["A'", ['a', 'A']],
+                                   ['B', ['B', 'b']], ['B', ['c', 'a']], ['B', ['c', 'b']], ['B', ['a']]]
+            return grammar
+
+        for operation in ('left_factoring', 'remove_left_recursion_direct'):
+            expected = make_grammar()
+            getattr(expected, operation)()
+            grammar = make_grammar()
+            getattr(grammar, operation)(jobs=2, chunk_size=1)
+            self.assertEqual(grammar.non_terms, expected.non_terms)
+            self.assertEqual(grammar.productions, expected.productions)
+
+        grammar = make_grammar()
+        grammar.non_terms.append("A''")
+        self.assertEqual(grammar._hatch_groups(grammar.non_terms), [[0, 1, 3], [2]])
+
+    def test_find_cycles(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'cycles_test.json')
+        self.assertEqual(grammar.find_cycles(), [['A', 'B'], ['C']])
+
+        # Цепная продукция без обратного пути не образует цикл
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_eps_test1.json')
+        grammar.remove_eps_productions()
+        self.assertEqual(grammar.find_cycles(), [])
+
+    def test_remove_cycles(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'cycles_test.json')
+        grammar.remove_cycles()
+        self.assertEqual(grammar.non_terms, ['S', 'A', 'C'])
+        self.assertEqual(grammar.productions,
+                         [['S', ['A']], ['S', ['a']], ['A', ['b']], ['A', ['c']], ['C', ['S', 'c']]])
+        self.assertEqual(grammar.find_cycles(), [])
+
+    def test_remove_useless_symbols(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'useless_symbols_test.json')
+        grammar.remove_useless_symbols()
+        self.assertEqual(grammar.terms, ['a', 'b'])
+        self.assertEqual(grammar.non_terms, ['S', 'A'])
+        self.assertEqual(grammar.productions, [['S', ['a', 'S']], ['S', ['A']], ['A', ['a']], ['A', ['ε']]])
+
+        # Язык пуст, если стартовый символ непорождающий
+        grammar.productions = [['S', ['a', 'S']], ['A', ['a']]]
+        with self.assertRaises(BaseException):
+            grammar.remove_useless_symbols()
+
+    def test_to_cnf(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'first_follow_test.json')
+        grammar.to_cnf()
+        self.assertEqual(grammar.start_symbol, 'E')
+        for left, right in grammar.productions:
+            if len(right) == 1:
+                self.assertIn(right[0], grammar.terms)
+            else:
+                self.assertEqual(len(right), 2)
+                self.assertTrue(set(right) <= set(grammar.non_terms))
+        self.assertIn(['F', ["('", "E''"]], grammar.productions)
+        self.assertIn(["E''", ['E', ")'"]], grammar.productions)
+        self.assertIn(["('", ['(']], grammar.productions)
+
+        # Пустая цепочка выводится только из нового стартового символа
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_eps_test1.json')
+        grammar.to_cnf()
+        self.assertEqual(grammar.start_symbol, "S'")
+        self.assertIn(["S'", ['ε']], grammar.productions)
+        for left, right in grammar.productions:
+            self.assertNotIn("S'", right)
+            if right == ['ε']:
+                self.assertEqual(left, "S'")
+
+    # Порядок полей в JSON-файле не важен
+    def test_load_from_json_productions_first(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'productions_first_test.json')
+        self.assertEqual(grammar.terms, ['a', 'b'])
+        self.assertEqual(grammar.non_terms, ['S'])
+        self.assertEqual(grammar.start_symbol, 'S')
+        self.assertEqual(grammar.productions,
+                         [['S', ['a', 'S', 'b', 'S']], ['S', ['b', 'S', 'a', 'S']], ['S', ['ε']]])
+
+    def test_save_load_binary(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_left_recursion_test.json')
+        grammar.remove_left_recursion_indirect()
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'grammar.bin')
+            grammar.save_binary(filename)
+            loaded = Grammar()
+            loaded.load_binary(filename)
+
+            with open(filename, 'r+b') as file:
+                file.write(b'XXXX')
+            with self.assertRaises(BaseException):
+                Grammar().load_binary(filename)
+
+        self.assertEqual(loaded.terms, grammar.terms)
+        self.assertEqual(loaded.non_terms, grammar.non_terms)
+        self.assertEqual(loaded.start_symbol, grammar.start_symbol)
+        self.assertEqual(loaded.productions, grammar.productions)
+
+        # Индексы продукций строятся только при первой выборке или изменении
+        version = loaded._productions.version
+        self.assertIsNotNone(loaded._productions._packed)
+        self.assertEqual(loaded._get_symbol_productions("X'"), grammar._get_symbol_productions("X'"))
+        self.assertIsNone(loaded._productions._packed)
+        self.assertEqual(loaded._productions.version, version)
+        loaded.left_factoring()
+        grammar.left_factoring()
+        self.assertEqual(loaded.productions, grammar.productions)
+
+    def test_save_to_json(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'first_follow_test.json')
+        grammar.productions = grammar.productions + [['F', ['"id"', '\\']]]
+        grammar.terms.extend(['"id"', '\\'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            for chunk_size in (1, 3, 4096):
+                filename = os.path.join(directory, 'grammar.json')
+                grammar.save_to_json(filename, chunk_size=chunk_size)
+                loaded = Grammar()
+                loaded.load_from_json(filename)
+
+                self.assertEqual(loaded.terms, grammar.terms)
+                self.assertEqual(loaded.non_terms, grammar.non_terms)
+                self.assertEqual(loaded.start_symbol, grammar.start_symbol)
+                # ε записывается как EPSILON_SIGN и при загрузке переводится обратно
+                self.assertEqual(loaded.productions, grammar.productions)
+
+            with open(filename) as file:
+                self.assertIn('["E\'", [":eps:"]]', file.read())
+
+    def test_save_to_text(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'left_factoring_test2.json')
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'grammar.txt')
+            grammar.save_to_text(filename, chunk_size=2)
+            with open(filename) as file:
+                lines = file.read().splitlines()
+
+        self.assertEqual(lines[:4], ['Terms: ' + ' '.join(grammar.terms), 'Non-terms: S E', 'Start symbol: S',
+                                     'Productions (4):'])
+        self.assertEqual(lines[4:], [left + ' -> ' + ' '.join(right) for left, right in grammar.productions])
+
+    # Грамматика из примера 4.28, Dragon book
+    def test_first_follow_sets(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'first_follow_test.json')
+        self.assertEqual(grammar.first_sets(),
+                         {'E': {'(', 'id'}, "E'": {'+', 'ε'}, 'T': {'(', 'id'}, "T'": {'*', 'ε'}, 'F': {'(', 'id'}})
+        self.assertEqual(grammar.follow_sets(),
+                         {'E': {')', '$'}, "E'": {')', '$'}, 'T': {'+', ')', '$'}, "T'": {'+', ')', '$'},
+                          'F': {'+', '*', ')', '$'}})
+        self.assertEqual(grammar.first_of_sequence(["E'", "T'"]), {'+', '*', 'ε'})
+        self.assertEqual(grammar.first_of_sequence(["T'", 'F', 'E']), {'*', '(', 'id'})
+
+    def test_first_sets_invalidation(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_eps_test1.json')
+        self.assertEqual(grammar.first_sets(), {'S': {'a', 'b', 'ε'}})
+        grammar.remove_eps_productions()
+        self.assertEqual(grammar.first_sets(), {'S': {'a', 'b'}, "S'": {'a', 'b', 'ε'}})
@@ -0,0 +1,113 @@
+import random
+import unittest
+
+from grammar import Grammar
+
+
+def _rebuild(grammar):
+    """Копия грамматики, для которой проверки выполняются с нуля"""
+    copy = Grammar()
+    copy.terms = list(grammar.terms)
+    copy.non_terms = list(grammar.non_terms)
+    copy.start_symbol = grammar.start_symbol
+    copy.productions = grammar.productions
+    return copy
+
+
+def _answers(grammar):
+    try:
+        grammar._check_grammar()
+        valid = 'ok'
+    except BaseException as e:
+        valid = str(e)
+    nullable = sorted(grammar._symbols.names(grammar._get_nullable_symbols()))
+    return [valid, grammar._check_eps_productions(), grammar._check_cycles(),
+            grammar._check_left_recursion_direct(), nullable]
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.grammar = Grammar()
+        self.grammar.terms = ['a', 'b']
+        self.grammar.non_terms = ['S', 'A']
+        self.grammar.start_symbol = 'S'
+        self.grammar.productions = [['S', ['A', 'b']], ['A', ['a']]]
+
+    def test_nullable(self):
+        grammar = self.grammar
+        grammar.add_production('A', ['S'])
+        grammar.add_production('S', ['A'])
+        grammar.add_production('A', ['ε'])
+        self.assertEqual(sorted(grammar._symbols.names(grammar._get_nullable_symbols())), ['A', 'S'])
+        self.assertTrue(grammar._check_eps_productions())
+        self.assertTrue(grammar._check_cycles())
+
+        # A и S выводят ε только через A->ε, хотя A->S и S->A остаются
+        grammar.remove_production('A', ['ε'])
+        self.assertEqual(grammar._get_nullable_symbols(), set())
+        self.assertFalse(grammar._check_eps_productions())
+
+        grammar.remove_production('S', ['A'])
+        self.assertFalse(grammar._check_cycles())
+        self.assertEqual(_answers(grammar), _answers(_rebuild(grammar)))
+
+    def test_validation_and_left_recursion(self):
+        grammar = self.grammar
+        grammar.add_production('B', ['B', 'a'])
+        with self.assertRaises(BaseException):
+            grammar._check_grammar()
+        self.assertFalse(grammar._check_left_recursion_direct())
+
+        grammar.add_symbol('B')
+        grammar._check_grammar()
+        self.assertTrue(grammar._check_left_recursion_direct())
+        self.assertEqual(grammar.non_terms, ['S', 'A', 'B'])
+
+        # A->B становится цепной продукцией после добавления B в нетерминалы
+        grammar.add_production('A', ['C'])
+        grammar.add_production('C', ['A'])
+        self.assertFalse(grammar._check_cycles())
+        grammar.add_symbol('C')
+        self.assertTrue(grammar._check_cycles())
+
+        with self.assertRaises(BaseException):
+            grammar.add_symbol('a')
+        with self.assertRaises(BaseException):
+            grammar.remove_production('S', ['a'])
+
+    def test_random_edits(self):
+        rng = random.Random(3)
+        grammar = self.grammar
+        names = ['S', 'A', 'B', 'C', 'a', 'b']
+        for _ in range(500):
+            action = rng.random()
+            if action < 0.1:
+                symbol = rng.choice(['B', 'C', 'c'])
+                if symbol not in grammar.terms and symbol not in grammar.non_terms:
+                    grammar.add_symbol(symbol, is_term=symbol == 'c')
+            elif action < 0.6 or len(grammar._productions) == 0:
+                right = [rng.choice(names) for _ in range(rng.choice([1, 1, 2, 3]))]
+                grammar.add_production(rng.choice(names[:4]), ['ε'] if rng.random() < 0.2 else right)
+            else:
+                grammar.remove_production(*rng.choice(grammar.productions))
+            self.assertEqual(_answers(grammar), _answers(_rebuild(grammar)))
+
+    # После преобразования данные строятся заново при следующей правке
+    def test_other_changes(self):
+        grammar = self.grammar
+        grammar.add_production('S', ['S', 'a'])
+        self.assertTrue(grammar._check_left_recursion_direct())
+        grammar.remove_left_recursion_direct_symbol('S')
+        self.assertIsNone(grammar._current_state())
+        self.assertFalse(grammar._check_left_recursion_direct())
+
+        grammar.add_production("S'", ["S'", 'b'])
+        self.assertIsNotNone(grammar._current_state())
+        self.assertTrue(grammar._check_left_recursion_direct())
+        self.assertEqual(_answers(grammar), _answers(_rebuild(grammar)))
+
+        # Изменение списка символов на месте тоже делает состояние устаревшим
+        grammar.add_production('A', ['b'])
+        grammar.non_terms[1] = 'B'
+        self.assertIsNone(grammar._current_state())
+        self.assertEqual(_answers(grammar), _answers(_rebuild(grammar)))
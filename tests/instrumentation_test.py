@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+
+import instrumentation
+from config import TestConfig
+from grammar import Grammar
+
+
+class TestInstrumentation(unittest.TestCase):
+    def _load(self, filename):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + filename)
+        return grammar
+
+    def tearDown(self):
+        instrumentation.disable()
+
+    def test_memory_sink(self):
+        sink = instrumentation.MemorySink()
+        instrumentation.enable(sink, trace_memory=True)
+        grammar = self._load('remove_eps_test1.json')
+        grammar.remove_eps_productions()
+        grammar.remove_cycles()
+        instrumentation.disable()
+
+        # Без включенного сбора записи не добавляются
+        grammar.left_factoring()
+
+        self.assertEqual([x['path'] for x in sink.records],
+                         ['remove_eps_productions', 'remove_cycles/find_cycles', 'remove_cycles'])
+        record = sink.records[0]
+        self.assertEqual((record['productions_before'], record['productions_after']), (3, 10))
+        self.assertEqual((record['productions_added'], record['productions_removed']), (8, 1))
+        self.assertEqual(record['counters'], {'nullable_iterations': 4, 'eps_combinations': 6})
+        self.assertGreater(record['peak_bytes'], 0)
+
+        report = instrumentation.format_report(sink.records)
+        self.assertIn('  find_cycles', report)
+        self.assertLess(report.index('remove_cycles'), report.index('  find_cycles'))
+
+    def test_json_lines_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'profile.jsonl')
+            instrumentation.enable(instrumentation.JsonLinesSink(filename))
+            grammar = self._load('left_factoring_test.json')
+            grammar.left_factoring()
+            with self.assertRaises(BaseException):
+                grammar.remove_left_recursion_direct_symbol('X')
+            instrumentation.disable().close()
+
+            with open(filename) as file:
+                records = [json.loads(line) for line in file]
+
+        self.assertEqual([x['operation'] for x in records], ['left_factoring', 'remove_left_recursion_direct_symbol'])
+        self.assertEqual(records[0]['counters']['trie_nodes'], 8)
+        self.assertNotIn('peak_bytes', records[0])
+        self.assertEqual(records[1]['error'], 'BaseException: Symbol must be nonterminal')
@@ -0,0 +1,20 @@
+import io
+import unittest
+
+from json_stream import JsonStreamReader
+
+
+class TestJsonStreamReader(unittest.TestCase):
+    def test_iter_items_small_chunks(self):
+        text = '{"terms": ["a", "id"], "count": 12345, "productions": [["S", ["id", "S"]], ["S", [":eps:"]]], "x": {}}'
+        items = []
+        for key, value in JsonStreamReader(io.StringIO(text), chunk_size=3).iter_items(stream_keys=('productions',)):
+            items.append((key, list(value) if key == 'productions' else value))
+
+        self.assertEqual(items, [('terms', ['a', 'id']), ('count', 12345),
+                                 ('productions', [['S', ['id', 'S']], ['S', [':eps:']]]), ('x', {})])
+
+    def test_invalid_json(self):
+        reader = JsonStreamReader(io.StringIO('{"terms": ["a", }'), chunk_size=4)
+        with self.assertRaises(ValueError):
+            list(reader.iter_items())
@@ -0,0 +1,96 @@
+import glob
+import itertools
+import os
+import random
+import unittest
+
+from benchmarks.generator import generate_grammar
+from benchmarks.parser import expression_grammar
+from config import TestConfig
+from grammar import Grammar
+from language import Recognizer, SentenceCounter, compare_languages
+from ll1 import LL1Parser, LL1Table
+
+
+def _copy(grammar):
+    copy = Grammar()
+    copy.terms = list(grammar.terms)
+    copy.non_terms = list(grammar.non_terms)
+    copy.start_symbol = grammar.start_symbol
+    copy.productions = grammar.productions
+    return copy
+
+
+class TestLanguage(unittest.TestCase):
+    def test_counter(self):
+        grammar = expression_grammar()
+        counter = SentenceCounter(grammar, 9)
+        self.assertEqual(counter.counts(), [0, 1, 0, 3, 0, 11, 0, 45, 0, 197])
+
+        parser = LL1Parser(LL1Table(expression_grammar()))
+        tokens = ['+', '*', '(', ')', 'id']
+        expected = {x for x in itertools.product(tokens, repeat=5) if parser.parse(list(x))}
+        self.assertEqual(counter.sentences(5), expected)
+
+        rng = random.Random(0)
+        for _ in range(100):
+            self.assertTrue(parser.parse(counter.sample(9, rng)))
+        self.assertIsNone(counter.sample(8, rng))
+
+    # Циклы из цепных продукций и продукций с ε не дают бесконечных чисел
+    def test_counter_cycles(self):
+        grammar = Grammar()
+        grammar.terms = ['a', 'b']
+        grammar.non_terms = ['S', 'A']
+        grammar.start_symbol = 'S'
+        grammar.productions = [['S', ['A']], ['S', ['a']], ['A', ['S']], ['A', ['A', 'A']],
+                               ['A', ['b']], ['A', ['ε']]]
+        counter = SentenceCounter(grammar, 3)
+        self.assertEqual(counter.count(0), 1)
+        self.assertTrue(all(counter.count(x) > 0 for x in range(4)))
+        self.assertEqual(counter.sentences(2), {('a', 'a'), ('a', 'b'), ('b', 'a'), ('b', 'b')})
+        self.assertEqual(len(counter.sample(3, random.Random(1))), 3)
+
+    def test_recognizer(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'remove_eps_test1.json')
+        recognizer = Recognizer(grammar)
+        for n in range(9):
+            for sentence in itertools.product('ab', repeat=n):
+                self.assertEqual(recognizer.recognize(sentence), sentence.count('a') == sentence.count('b'))
+        self.assertFalse(recognizer.recognize(['a', 'S', 'b']))
+        self.assertFalse(recognizer.recognize(['c']))
+
+    def test_compare_test_grammars(self):
+        operations = ['remove_eps_productions', 'remove_cycles', 'remove_useless_symbols', 'left_factoring',
+                      'to_cnf']
+        for filename in sorted(glob.glob(os.path.join(TestConfig.grammars_dir, '*.json'))):
+            for operation in operations:
+                grammar = Grammar()
+                grammar.load_from_json(filename)
+                transformed = _copy(grammar)
+                getattr(transformed, operation)()
+                self.assertEqual(compare_languages(grammar, transformed, 6), [], (filename, operation))
+
+    def test_compare_generated_grammars(self):
+        grammar = generate_grammar(seed=1, non_terms=100, alternatives=4, rhs_length=4, left_recursion=0.2,
+                                   nullable=0.3, non_term_ratio=0.5, terms=6)
+        transformed = _copy(grammar)
+        transformed.remove_eps_productions()
+        self.assertEqual(compare_languages(grammar, transformed, 10), [])
+
+        grammar = generate_grammar(seed=1, non_terms=100, alternatives=4, rhs_length=3, left_recursion=0.3,
+                                   non_term_ratio=0.5, terms=6)
+        transformed = _copy(grammar)
+        transformed.remove_left_recursion_moore()
+        self.assertEqual(compare_languages(grammar, transformed, 10), [])
+
+    def test_compare_difference(self):
+        grammar = expression_grammar()
+        changed = _copy(grammar)
+        changed.productions = [x for x in grammar.productions if x != ["T'", ['*', 'F', "T'"]]]
+        changed.add_production("T'", ['*', 'F'])
+
+        differences = compare_languages(grammar, changed, 7)
+        self.assertEqual(differences[0], {'sentence': ['id', '*', 'id', '*', 'id'], 'before': True, 'after': False})
+        self.assertTrue(all(x['before'] and not x['after'] for x in differences))
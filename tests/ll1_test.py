@@ -0,0 +1,71 @@
+import io
+import unittest
+
+from benchmarks.parser import expression_grammar, generate_sentences
+from config import TestConfig, BaseConfig
+from grammar import Grammar
+from ll1 import LL1Parser, LL1Table, iter_file_tokens
+
+
+class TestLL1(unittest.TestCase):
+    # Грамматика из примера 4.30, Ахо, Лам, Сети, Ульман. Компиляторы
+    def test_table(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'first_follow_test.json')
+        table = LL1Table(grammar)
+        self.assertTrue(table.is_ll1)
+        self.assertEqual(table.terminals, ['+', '*', '(', ')', 'id', BaseConfig.END_SYMBOL])
+        self.assertEqual(table.get('E', 'id'), ('E', ['T', "E'"]))
+        self.assertEqual(table.get("E'", '+'), ("E'", ['+', 'T', "E'"]))
+        self.assertEqual(table.get("E'", ')'), ("E'", []))
+        self.assertEqual(table.get("T'", BaseConfig.END_SYMBOL), ("T'", []))
+        self.assertEqual(table.get('F', '('), ('F', ['(', 'E', ')']))
+        self.assertIsNone(table.get('E', '+'))
+        self.assertIsNone(table.get('F', ')'))
+
+    def test_conflicts(self):
+        grammar = Grammar()
+        grammar.terms = ['a', 'b']
+        grammar.non_terms = ['S', 'A']
+        grammar.start_symbol = 'S'
+        grammar.productions = [['S', ['a', 'A']], ['S', ['a', 'b']], ['A', ['b']], ['A', ['ε']]]
+        table = LL1Table(grammar)
+        self.assertFalse(table.is_ll1)
+        self.assertEqual(table.conflicts, [{'non_term': 'S', 'terminal': 'a', 'productions': ['S->aA', 'S->ab']}])
+
+    def test_parse(self):
+        grammar = Grammar()
+        grammar.load_from_json(TestConfig.grammars_dir + 'first_follow_test.json')
+        parser = LL1Parser(LL1Table(grammar))
+
+        accepted = ['id', 'id + id * id', '( id + id ) * id', '( ( id ) )']
+        rejected = ['', 'id +', '( id', 'id id', 'id )', 'id x', 'id ' + BaseConfig.END_SYMBOL]
+        for sentence in accepted:
+            self.assertTrue(parser.parse(sentence.split()), sentence)
+        for sentence in rejected:
+            self.assertFalse(parser.parse(sentence.split()), sentence)
+
+        sentences = [x.split() for x in accepted + rejected]
+        expected = [True] * len(accepted) + [False] * len(rejected)
+        self.assertEqual(parser.parse_batch(sentences), expected)
+        self.assertEqual([parser.parse_encoded(parser.encode(x)) for x in sentences], expected)
+        self.assertEqual(list(parser.parse_lines(io.StringIO('\n'.join(accepted + rejected)))), expected)
+
+    def test_parse_file_tokens(self):
+        parser = LL1Parser(LL1Table(expression_grammar()))
+        text = 'id\n' + '+ ( id + id ) * id\n' * 1000
+        self.assertTrue(parser.parse(iter_file_tokens(io.StringIO('( ' * 1000 + 'id' + ' )' * 1000))))
+        self.assertTrue(parser.parse(iter_file_tokens(io.StringIO(text))))
+        self.assertFalse(parser.parse(iter_file_tokens(io.StringIO(text + ')'))))
+
+        # Границы блоков не совпадают с границами строк и терминалов
+        for chunk_size in (1, 2, 3, 7):
+            self.assertEqual(list(iter_file_tokens(io.StringIO(text), chunk_size)), text.split())
+        self.assertEqual(list(iter_file_tokens(io.StringIO(' id  +\tid '), 2)), ['id', '+', 'id'])
+        self.assertEqual(list(iter_file_tokens(io.StringIO(''))), [])
+
+    def test_generated_sentences(self):
+        grammar = expression_grammar()
+        parser = LL1Parser(LL1Table(grammar))
+        sentences = generate_sentences(grammar, 50, 30, seed=3)
+        self.assertTrue(all(parser.parse_batch(sentences)))
@@ -0,0 +1,38 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from config import TestConfig
+from main import run_batch
+
+
+class TestBatch(unittest.TestCase):
+    def test_run_batch(self):
+        with tempfile.TemporaryDirectory() as directory:
+            bad_filename = os.path.join(directory, 'bad.json')
+            with open(bad_filename, 'w') as file:
+                file.write('{"terms": []}')
+
+            output_dir = os.path.join(directory, 'out')
+            report = os.path.join(directory, 'report.jsonl')
+            inputs = [TestConfig.grammars_dir + 'remove_eps_test*.json', bad_filename]
+            with redirect_stdout(StringIO()):
+                summary = run_batch(inputs, ['remove_eps_productions'], output_dir,
+                                    jobs=2, chunk_size=1, report=report)
+
+            self.assertEqual(summary['files'], 4)
+            self.assertEqual(summary['ok'], 3)
+            self.assertEqual(summary['failed'], 1)
+
+            with open(report) as file:
+                results = [json.loads(line) for line in file]
+            self.assertEqual([x['ok'] for x in results], [True, True, True, False])
+            self.assertEqual(results[3]['error'], 'BaseException: Unable to parse JSON file')
+
+            with open(os.path.join(output_dir, 'remove_eps_test1.json')) as file:
+                data = json.load(file)
+            self.assertEqual(data['start_symbol'], "S'")
+            self.assertIn(["S'", [':eps:']], data['productions'])
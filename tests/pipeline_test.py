@@ -0,0 +1,75 @@
+import unittest
+
+from config import TestConfig
+from grammar import Grammar
+from pipeline import GrammarPipeline
+
+
+class CountingGrammar(Grammar):
+    def __init__(self):
+        super().__init__()
+        self.checks = 0
+
+    def _check_grammar(self, check_productions=True):
+        if not self._validated:
+            self.checks += 1
+        super()._check_grammar(check_productions)
+
+
+class TestGrammarPipeline(unittest.TestCase):
+    def _load(self, filename, grammar_class=Grammar):
+        grammar = grammar_class()
+        grammar.load_from_json(TestConfig.grammars_dir + filename)
+        return grammar
+
+    def test_run(self):
+        expected = self._load('remove_eps_test2.json')
+        expected.remove_eps_productions()
+        expected.remove_cycles()
+        expected.left_factoring()
+
+        grammar = self._load('remove_eps_test2.json', CountingGrammar)
+        grammar.checks = 0
+        pipeline = GrammarPipeline(['remove_eps_productions', 'remove_cycles']).add('left_factoring')
+        results = pipeline.run(grammar)
+
+        self.assertEqual(grammar.productions, expected.productions)
+        self.assertEqual(grammar.non_terms, expected.non_terms)
+        self.assertEqual([x['step'] for x in results], ['remove_eps_productions', 'remove_cycles', 'left_factoring'])
+        self.assertTrue(all(x['changed'] for x in results))
+        self.assertEqual(results[-1]['productions'], len(expected.productions))
+        # Проверка выполняется один раз, а после конвейера снова включается
+        self.assertEqual(grammar.checks, 1)
+        self.assertFalse(grammar._validated)
+
+    def test_rounds(self):
+        grammar = self._load('cycles_test.json')
+        pipeline = GrammarPipeline().add('remove_cycles').add(lambda x: x.left_factoring(), name='factoring')
+        results = pipeline.run(grammar, rounds=5)
+
+        # Во втором раунде грамматика не меняется, третий раунд не выполняется
+        self.assertEqual([(x['round'], x['step'], x['changed']) for x in results],
+                         [(0, 'remove_cycles', True), (0, 'factoring', True),
+                          (1, 'remove_cycles', False), (1, 'factoring', False)])
+
+        # Шаг, не изменивший грамматику, при повторном запуске пропускается
+        pipeline = GrammarPipeline(['remove_cycles', 'remove_cycles'])
+        self.assertEqual([x['changed'] for x in pipeline.run(grammar, rounds=3)], [False, False])
+
+    def test_invalid_grammar(self):
+        grammar = Grammar()
+        with self.assertRaises(BaseException):
+            GrammarPipeline(['left_factoring']).run(grammar)
+        self.assertFalse(grammar._validated)
+
+    def test_unchanged_step_keeps_productions(self):
+        grammar = self._load('cycles_test.json')
+        GrammarPipeline(['remove_cycles', 'left_factoring', 'to_cnf']).run(grammar)
+
+        # Шаги, которым нечего делать, не заменяют хранилище продукций
+        productions = grammar._productions
+        version = productions.version
+        results = GrammarPipeline(['left_factoring', 'to_cnf', 'remove_eps_productions']).run(grammar)
+        self.assertEqual([x['changed'] for x in results], [False, False, False])
+        self.assertIs(grammar._productions, productions)
+        self.assertEqual(productions.version, version)
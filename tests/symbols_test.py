@@ -0,0 +1,30 @@
+import unittest
+
+from symbols import SymbolList, SymbolTable
+
+
+class TestSymbolTable(unittest.TestCase):
+    def test_intern(self):
+        symbols = SymbolTable(['S', 'a'])
+        self.assertEqual(symbols.intern('S'), 0)
+        self.assertEqual(symbols.intern('id'), 2)
+        self.assertEqual(symbols.get('X'), None)
+        self.assertEqual(symbols.names([2, 1, 0]), ['id', 'a', 'S'])
+
+    def test_ranks(self):
+        symbols = SymbolTable(['b', "S'", 'S', 'a'])
+        ranks = symbols.ranks()
+        self.assertEqual(sorted(range(len(symbols)), key=ranks.__getitem__), [2, 1, 3, 0])
+
+    def test_symbol_list(self):
+        names = SymbolList(['S', 'A'])
+        version = names.version
+        names.append('B')
+        self.assertEqual(names.names(), {'S', 'A', 'B'})
+        names[1] = 'C'
+        self.assertEqual(names.names(), {'S', 'B', 'C'})
+        names += ['D']
+        names.remove('S')
+        self.assertEqual(names, ['C', 'B', 'D'])
+        self.assertEqual(names.names(), {'B', 'C', 'D'})
+        self.assertNotEqual(names.version, version)